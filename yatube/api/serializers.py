@@ -0,0 +1,75 @@
+"""Представления объектов в JSON с выбором полей (?fields=id,text).
+
+Для каждого ресурса — словарь «поле → функция от объекта»; считаются
+только запрошенные поля, а связанные таблицы присоединяются только
+для полей, которым они нужны (RELATED).
+"""
+
+
+class UnknownFields(Exception):
+    pass
+
+
+def _image(post):
+    return post.image.url if post.image else None
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': _image,
+    'comments_count': lambda post: post.comments_count,
+}
+POST_RELATED = {'author': 'author', 'group': 'group'}
+
+GROUP_FIELDS = {
+    'id': lambda group: group.pk,
+    'slug': lambda group: group.slug,
+    'title': lambda group: group.title,
+    'description': lambda group: group.description,
+}
+
+PROFILE_FIELDS = {
+    'id': lambda user: user.pk,
+    'username': lambda user: user.username,
+    'full_name': lambda user: user.get_full_name(),
+    'posts_count': lambda user: user.stats.posts_count,
+    'followers_count': lambda user: user.stats.followers_count,
+    'following_count': lambda user: user.stats.following_count,
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'text': lambda comment: comment.text,
+    'pub_date': lambda comment: comment.pub_date.isoformat(),
+    'author': lambda comment: comment.author.username,
+}
+COMMENT_RELATED = {'author': 'author'}
+
+
+def requested_fields(request, available):
+    """Поля из ?fields= в порядке запроса; без параметра — все."""
+    if not request.GET.get('fields'):
+        return list(available)
+    fields = [
+        field.strip() for field in request.GET['fields'].split(',')
+        if field.strip()
+    ]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise UnknownFields(unknown)
+    return fields
+
+
+def related(fields, related_fields):
+    """Связи для select_related, нужные выбранным полям."""
+    return [
+        related_fields[field] for field in fields if field in related_fields
+    ]
+
+
+def serialize(instance, available, fields):
+    return {field: available[field](instance) for field in fields}
@@ -0,0 +1,154 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+POSTS_URL = reverse('api:posts')
+FEED_URL = reverse('api:feed')
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(5)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        cls.POST_URL = reverse('api:post_detail', args=[cls.posts[0].pk])
+        cls.URLS = [
+            POSTS_URL, cls.POST_URL,
+            reverse('api:post_comments', args=[cls.posts[0].pk]),
+            reverse('api:groups'),
+            reverse('api:group_detail', args=[cls.group.slug]),
+            reverse('api:group_posts', args=[cls.group.slug]),
+            reverse('api:profile_detail', args=[cls.author.username]),
+            reverse('api:profile_posts', args=[cls.author.username]),
+            FEED_URL,
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        """Список идет по курсору и отдает только запрошенные поля."""
+        response = self.client.get(POSTS_URL, {
+            'limit': 2, 'fields': 'id,author'
+        })
+        first = response.json()
+        self.assertEqual(first['results'], [
+            {'id': post.pk, 'author': 'author'} for post in self.posts[:2:-1]
+        ][:2])
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            [item['id'] for item in second['results']],
+            [post.pk for post in self.posts[2:0:-1]]
+        )
+        self.assertEqual(set(second['results'][0]), {'id', 'author'})
+        response = self.client.get(POSTS_URL, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_unchanged_resource_is_not_modified_without_queries(self):
+        """Повторный запрос с ETag получает 304 без обращения к базе."""
+        for url in self.URLS:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('Last-Modified'))
+                for method in (self.reader_client.get,
+                               self.reader_client.head):
+                    with CaptureQueriesContext(connection) as queries:
+                        cached = method(
+                            url, HTTP_IF_NONE_MATCH=response['ETag']
+                        )
+                    self.assertEqual(cached.status_code, 304)
+                    # Только сессия и пользователь читателя.
+                    self.assertLessEqual(len(queries), 2)
+
+    def test_changes_refresh_validators(self):
+        """Новый комментарий и переименование меняют ETag поста."""
+        etag = self.client.get(self.POST_URL)['ETag']
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Еще'
+        )
+        response = self.client.get(self.POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.author.username = 'writer'
+        self.author.save()
+        response = self.client.get(self.POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author'], 'writer')
+
+    def test_comment_refreshes_post_lists(self):
+        """comments_count в списках: комментарий меняет их ETag."""
+        lists = [POSTS_URL, self.URLS[5], self.URLS[7], FEED_URL]
+        etags = {url: self.reader_client.get(url)['ETag'] for url in lists}
+        Comment.objects.create(
+            post=self.posts[-1], author=self.reader, text='Еще'
+        )
+        for url in lists:
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['results'][0]['comments_count'], 1
+                )
+
+    def test_feed_requires_login(self):
+        """Лента подписок — только для вошедшего пользователя."""
+        self.assertEqual(self.client.get(FEED_URL).status_code, 401)
+        results = self.reader_client.get(FEED_URL).json()['results']
+        self.assertEqual(
+            [item['id'] for item in results],
+            [post.pk for post in reversed(self.posts)]
+        )
+
+    def test_missing_objects(self):
+        """Несуществующие объекты — 404 в JSON."""
+        for url in (
+            reverse('api:group_detail', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+            reverse('api:post_detail', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('error', response.json())
+        # Запросы несуществующих постов не оставляют ключей версий.
+        self.assertIsNone(cache.get('version:post:0'))
+        self.assertIsNone(cache.get('modified:post:0'))
+
+    def test_views_stay_within_budget(self):
+        """Ответы API укладываются в объявленный бюджет запросов."""
+        for url in self.URLS:
+            with self.subTest(url=url):
+                # Первый запрос строит индексы адресов групп и имен.
+                self.reader_client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries), resolve(url).func.query_budget,
+                    '\n'.join(query['sql'] for query in queries)
+                )
@@ -0,0 +1,201 @@
+"""JSON API только для чтения: посты, группы, профили, комментарии, лента.
+
+Списки идут по курсору (?cursor=, ссылки next и previous в ответе),
+размер страницы — ?limit= до API_MAX_LIMIT, поля — ?fields=. Каждый
+ответ несет ETag и Last-Modified по версиям областей (posts.versions);
+если клиент прислал текущие, ответ 304 отдается до запросов к базе.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.decorators import query_budget
+from posts import counters, feeds, versions
+from posts.autocomplete import GROUPS, USERS
+from posts.models import Group, Post, User
+from posts.paginators import CursorPaginator
+
+from .serializers import (
+    COMMENT_FIELDS, COMMENT_RELATED, GROUP_FIELDS, POST_FIELDS, POST_RELATED,
+    PROFILE_FIELDS, UnknownFields, related, requested_fields, serialize
+)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def api_view(scopes, budget):
+    """GET-представление API с условным GET и бюджетом запросов."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except UnknownFields as error:
+                return json_response({
+                    'error': f'Неизвестные поля: {", ".join(error.args[0])}'
+                }, status=400)
+            except Http404:
+                return json_response({'error': 'Не найдено'}, status=404)
+        return query_budget(budget)(
+            require_safe(versions.conditional(scopes)(wrapper))
+        )
+    return decorator
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.MAX_POSTS))
+    except ValueError:
+        limit = settings.MAX_POSTS
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def page_response(request, page, available, fields):
+    return json_response({
+        'results': [serialize(item, available, fields) for item in page],
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.previous_cursor),
+    })
+
+
+def posts_page(request, queryset):
+    fields = requested_fields(request, POST_FIELDS)
+    page = CursorPaginator(
+        queryset.select_related(*related(fields, POST_RELATED)),
+        page_limit(request)
+    ).get_page(request.GET.get('cursor'))
+    return page_response(request, page, POST_FIELDS, fields)
+
+
+# В пост входят имя автора и адрес группы: их переименование меняет
+# представление любых постов.
+NAMES = [('users',), ('groups',)]
+# В списках постов есть comments_count: любой комментарий меняет их.
+POST_LISTS = NAMES + [('comments',)]
+
+
+def post_scopes(request, post_id):
+    # Версии несуществующих постов не заводятся: иначе каждый запрос
+    # с новым id оставлял бы в кэше вечные ключи.
+    if versions.post_author_id(post_id) is None:
+        return None
+    return [('post', post_id)] + NAMES
+
+
+def group_scopes(request, slug):
+    pk = GROUPS.find(slug)
+    return [('group', pk)] + NAMES if pk else None
+
+
+def group_posts_scopes(request, slug):
+    pk = GROUPS.find(slug)
+    return [('group', pk)] + POST_LISTS if pk else None
+
+
+def profile_scopes(request, username):
+    pk = USERS.find(username)
+    return [('profile', pk)] + NAMES if pk else None
+
+
+def profile_posts_scopes(request, username):
+    pk = USERS.find(username)
+    return [('profile', pk)] + POST_LISTS if pk else None
+
+
+def feed_scopes(request):
+    if not request.user.is_authenticated:
+        return None
+    # Любое изменение постов поднимает версию ленты index, так что
+    # по ней и по подпискам читателя лента подписок не устареет.
+    return [('feed', request.user.pk), ('index',)] + POST_LISTS
+
+
+@api_view(lambda request: [('index',)] + POST_LISTS, budget=1)
+def posts(request):
+    return posts_page(request, Post.objects.all())
+
+
+@api_view(post_scopes, budget=1)
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    post = get_object_or_404(
+        Post.objects.select_related(*related(fields, POST_RELATED)),
+        pk=post_id
+    )
+    return json_response(serialize(post, POST_FIELDS, fields))
+
+
+@api_view(post_scopes, budget=2)
+def post_comments(request, post_id):
+    fields = requested_fields(request, COMMENT_FIELDS)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page = CursorPaginator(
+        post.comments.select_related(*related(fields, COMMENT_RELATED)),
+        page_limit(request)
+    ).get_page(request.GET.get('cursor'))
+    return page_response(request, page, COMMENT_FIELDS, fields)
+
+
+@api_view(lambda request: [('groups',)], budget=1)
+def groups(request):
+    fields = requested_fields(request, GROUP_FIELDS)
+    page = CursorPaginator(
+        Group.objects.order_by('-pk'), page_limit(request), keys=('pk',)
+    ).get_page(request.GET.get('cursor'))
+    return page_response(request, page, GROUP_FIELDS, fields)
+
+
+@api_view(group_scopes, budget=1)
+def group_detail(request, slug):
+    fields = requested_fields(request, GROUP_FIELDS)
+    group = get_object_or_404(Group, slug=slug)
+    return json_response(serialize(group, GROUP_FIELDS, fields))
+
+
+@api_view(group_posts_scopes, budget=2)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return posts_page(request, group.posts.all())
+
+
+@api_view(profile_scopes, budget=2)
+def profile_detail(request, username):
+    fields = requested_fields(request, PROFILE_FIELDS)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    counters.get_stats(author)
+    return json_response(serialize(author, PROFILE_FIELDS, fields))
+
+
+@api_view(profile_posts_scopes, budget=2)
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return posts_page(request, author.posts.all())
+
+
+@api_view(feed_scopes, budget=4)
+def feed(request):
+    """Лента подписок текущего пользователя (сессия сайта)."""
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Нужна авторизация'}, status=401)
+    fields = requested_fields(request, POST_FIELDS)
+    page = feeds.FeedPaginator(
+        request.user, page_limit(request)
+    ).get_page(request.GET.get('cursor'))
+    return page_response(request, page, POST_FIELDS, fields)
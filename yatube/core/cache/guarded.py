@@ -0,0 +1,101 @@
+"""Кэш дорогих значений без «давки» при их истечении.
+
+fetch(key, compute, timeout) хранит значение вместе со сроком
+свежести, версией и временем вычисления и защищает его тремя способами:
+
+* один пересчет — пересчитывает тот, кто первым взял блокировку
+  (cache.add), остальные тем временем получают прежнее значение;
+* ранний пересчет — незадолго до истечения отдельный запрос с
+  вероятностью, растущей к концу срока и с временем вычисления,
+  пересчитывает значение заранее (XFetch), и к истечению обычно
+  уже готово новое;
+* устаревшее вместо ошибки — после срока свежести значение хранится
+  еще CACHE_STALE_TIMEOUT секунд и отдается, пока идет пересчет или
+  если база занята (OperationalError, например database is locked).
+
+Смена version делает значение устаревшим так же, как истечение срока:
+ключ не зависит от версии, поэтому после записи в ленту есть что отдать,
+пока новая версия собирается.
+
+Если значения еще нет совсем, ожидающие ждут результат первого до
+CACHE_LOCK_TIMEOUT секунд и только потом считают сами. Блокировка
+снимается после записи значения и только своя (по токену): истекшую
+блокировку мог уже взять другой.
+"""
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError
+
+# Как часто ожидающие проверяют, не появилось ли значение
+WAIT_INTERVAL = 0.05
+
+
+def fetch(key, compute, timeout, version=None):
+    """Значение из кэша или compute(), по одному пересчету на истечение."""
+    return fetch_entry(key, compute, timeout, version)[0]
+
+
+def fetch_entry(key, compute, timeout, version=None):
+    """Как fetch, но возвращает (значение, текущей ли оно версии).
+
+    Значение прежней версии вызывающий может не класть в другие кэши.
+    """
+    entry = cache.get(key)
+    if entry is not None and _fresh(entry, version):
+        return entry[0], True
+    lock_key, token = f'{key}:lock', uuid.uuid4().hex
+    if not cache.add(lock_key, token, settings.CACHE_LOCK_TIMEOUT):
+        if entry is not None:
+            return entry[0], entry[1] == version
+        entry = _wait(key, version)
+        if entry is not None:
+            return entry[0], True
+    try:
+        started = time.monotonic()
+        try:
+            value = compute()
+        except OperationalError:
+            if entry is None:
+                raise
+            return entry[0], entry[1] == version
+        cache.set(
+            key,
+            (value, version, time.time() + timeout,
+             time.monotonic() - started),
+            timeout + settings.CACHE_STALE_TIMEOUT
+        )
+    finally:
+        _release(lock_key, token)
+    return value, True
+
+
+def _release(lock_key, token):
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _fresh(entry, version):
+    _, entry_version, expires, delta = entry
+    if entry_version != version:
+        return False
+    # XFetch: -log(random) обычно мал, но изредка велик, так что
+    # кто-то один начинает пересчет за несколько delta до срока.
+    early = delta * settings.CACHE_EARLY_BETA * -math.log(
+        1 - random.random()
+    )
+    return time.time() + early < expires
+
+
+def _wait(key, version):
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[1] == version:
+            return entry
+    return None
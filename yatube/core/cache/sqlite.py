@@ -0,0 +1,269 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+Файл открыт в режиме WAL: читатели не блокируют писателя, и все
+воркеры gunicorn видят одни и те же записи и одну и ту же инвалидацию.
+Целые числа хранятся как INTEGER, и incr — это один UPDATE в
+транзакции BEGIN IMMEDIATE, атомарный между процессами. Число записей
+и их суммарный размер ведут триггеры, и проверка лимитов MAX_ENTRIES
+и MAX_SIZE не сканирует таблицу; при превышении
+удаляются сначала просроченные, затем давно не читанные записи (LRU).
+
+Чтение не пишет в файл: время чтения копится в памяти и записывается
+одной транзакцией раз в ACCESS_FLUSH_INTERVAL секунд, после
+ACCESS_BATCH ключей или перед вытеснением.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.sqlite.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, bytes = bytes - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size;
+END;
+'''
+UPSERT = '''
+INSERT INTO cache (key, value, expires, accessed, size)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    expires = excluded.expires,
+    accessed = excluded.accessed,
+    size = excluded.size
+'''
+ALIVE = '(expires IS NULL OR expires > ?)'
+# Время последнего чтения обновляется не чаще раза в секунду:
+# иначе каждое чтение превращалось бы в запись.
+ACCESS_RESOLUTION = 1
+ACCESS_FLUSH_INTERVAL = 10
+ACCESS_BATCH = 1000
+
+
+def encode(value):
+    if type(value) is int:
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get('OPTIONS', {})
+        self._max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self._local = threading.local()
+        # Экземпляр кэша у каждого потока свой, и накопленное тоже.
+        self._accessed = {}
+        self._flushed = time.monotonic()
+
+    def _connection(self):
+        # Соединение свое у каждого потока и у каждого процесса после fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.executescript(SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        connection = self._connection()
+        rows = connection.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({", ".join("?" * len(keys))}) AND {ALIVE}',
+            (*keys, now)
+        ).fetchall()
+        for key, _, accessed in rows:
+            if now - accessed > ACCESS_RESOLUTION:
+                self._accessed[key] = now
+        if self._accessed and (
+            len(self._accessed) >= ACCESS_BATCH
+            or time.monotonic() - self._flushed > ACCESS_FLUSH_INTERVAL
+        ):
+            with self._transaction() as connection:
+                self._write_accessed(connection)
+        return {keys[key]: decode(value) for key, value, _ in rows}
+
+    def _write_accessed(self, connection):
+        accessed, self._accessed = self._accessed, {}
+        self._flushed = time.monotonic()
+        connection.executemany(
+            'UPDATE cache SET accessed = max(accessed, ?) WHERE key = ?',
+            [(at, key) for key, at in accessed.items()]
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self._key(key, version), *self._encode(value, expires, now))
+            for key, value in data.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+        return []
+
+    def _encode(self, value, expires, now):
+        value, size = encode(value)
+        return value, expires, now, size
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            if connection.execute(
+                f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}', (key, now)
+            ).fetchone():
+                return False
+            connection.execute(UPSERT, (
+                key, *self._encode(value, self.get_backend_timeout(timeout),
+                                   now)
+            ))
+            self._cull(connection, now)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        return bool(self._connection().execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (self.get_backend_timeout(timeout), self._key(key, version), now)
+        ).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            if not connection.execute(
+                f'UPDATE cache SET value = value + ? WHERE key = ? '
+                f'AND typeof(value) = \'integer\' AND {ALIVE}',
+                (delta, key, now)
+            ).rowcount:
+                if connection.execute(
+                    f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+                    (key, now)
+                ).fetchone():
+                    raise TypeError(f"Key '{key}' is not an integer")
+                raise ValueError(f"Key '{key}' not found")
+            return connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()[0]
+
+    def has_key(self, key, version=None):
+        return self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (self._key(key, version), time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        return bool(self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        ).rowcount)
+
+    def delete_many(self, keys, version=None):
+        with self._transaction() as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', [
+                (self._key(key, version),) for key in keys
+            ])
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def _over_limits(self, connection):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        return (
+            entries if entries > self._max_entries or size > self._max_size
+            else 0
+        )
+
+    def _cull(self, connection, now):
+        entries = self._over_limits(connection)
+        if not entries:
+            return
+        self._write_accessed(connection)
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (now,)
+        )
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        while True:
+            entries = self._over_limits(connection)
+            if not entries:
+                return
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(1, entries // self._cull_frequency),)
+            )
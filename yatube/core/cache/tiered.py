@@ -0,0 +1,220 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим кэшем.
+
+Ключи с префиксами LOCAL_PREFIXES читаются сначала из памяти процесса
+(не больше MAX_ENTRIES записей, каждая не дольше LOCAL_TIMEOUT секунд
+и не дольше своего срока в общем кэше), остальные — сразу из общего
+кэша LOCATION. Запись идет в общий кэш и в память своего процесса.
+
+Локально держатся только значения, которые не меняются под своим
+ключом: карточки постов (ключ включает время правки), страницы гостей
+(ключ включает ETag), автор поста. Инвалидацию тогда передают ключи
+версий (posts.versions): они всегда читаются из общего кэша, и после
+записи в область все процессы сразу ищут значения под новым ключом.
+LOCAL_TIMEOUT ограничивает остальное — удаление ключа и clear() в
+другом процессе.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'MAX_ENTRIES': 1000, 'LOCAL_TIMEOUT': 5},
+        },
+        'shared': {'BACKEND': 'core.cache.sqlite.SQLiteCache', ...},
+    }
+
+Счетчики попаданий, промахов и вытеснений каждый процесс раз в
+STATS_INTERVAL секунд прибавляет к общим (manage.py cache_stats).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+LOCAL_PREFIXES = ('post_card:', 'guest_page:', 'post_author:')
+STATS = ('local_hits', 'local_misses', 'shared_hits', 'shared_misses',
+         'evictions')
+STATS_KEY = 'tiered_stats:'
+
+
+class _Store:
+    """Память процесса: Django создает экземпляр кэша в каждом потоке."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = dict.fromkeys(STATS, 0)
+        self.flushed = time.monotonic()
+
+
+_stores = {}
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get('OPTIONS', {})
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local_prefixes = tuple(
+            options.get('LOCAL_PREFIXES', LOCAL_PREFIXES)
+        )
+        self._stats_interval = options.get('STATS_INTERVAL', 10)
+        store = _stores.setdefault((location, self.key_prefix), _Store())
+        self._entries = store.entries
+        self._lock = store.lock
+        self._store = store
+
+    @property
+    def shared(self):
+        return caches[self.location]
+
+    def _is_local(self, key):
+        return key.startswith(self._local_prefixes)
+
+    def _local_key(self, key, version):
+        return self.make_key(key, version=version)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._store.stats[name] += delta
+        if time.monotonic() - self._store.flushed > self._stats_interval:
+            self.flush_stats()
+
+    def _remember(self, data, timeout, version):
+        now = time.time()
+        expires = now + self._local_timeout
+        shared_expires = self.shared.get_backend_timeout(timeout)
+        if shared_expires is not None:
+            expires = min(expires, shared_expires)
+        evicted = 0
+        with self._lock:
+            for key, value in data.items():
+                if not self._is_local(key):
+                    continue
+                local_key = self._local_key(key, version)
+                if expires <= now:
+                    self._entries.pop(local_key, None)
+                    continue
+                # Копия в pickle: изменение полученного объекта не
+                # портит запись, как и у общего кэша.
+                self._entries[local_key] = (
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires
+                )
+                self._entries.move_to_end(local_key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count(evictions=evicted)
+
+    def _forget(self, keys, version):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(self._local_key(key, version), None)
+
+    def _recall(self, keys, version):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                local_key = self._local_key(key, version)
+                entry = self._entries.get(local_key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._entries[local_key]
+                    continue
+                self._entries.move_to_end(local_key)
+                found[key] = entry[0]
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        local = [key for key in keys if self._is_local(key)]
+        found = self._recall(local, version)
+        missing = [key for key in keys if key not in found]
+        shared = {}
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+        # Срок записи в общем кэше неизвестен: хватит LOCAL_TIMEOUT.
+        self._remember(shared, None, version)
+        self._count(
+            local_hits=len(found),
+            local_misses=len(local) - len(found),
+            shared_hits=len(shared),
+            shared_misses=len(missing) - len(shared),
+        )
+        found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._remember(data, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember({key: value}, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget([key], version)
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self._forget([key], version)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self._forget(keys, version)
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.shared.clear()
+
+    def stats(self):
+        """Счетчики этого процесса с последней передачи и число записей."""
+        with self._lock:
+            return {**self._store.stats, 'entries': len(self._entries)}
+
+    def flush_stats(self):
+        """Прибавляет счетчики процесса к общим и обнуляет их."""
+        store = self._store
+        with self._lock:
+            stats, store.stats = store.stats, dict.fromkeys(STATS, 0)
+            store.flushed = time.monotonic()
+        for name, value in stats.items():
+            if not value:
+                continue
+            key = STATS_KEY + name
+            if not self.shared.add(key, value, None):
+                try:
+                    self.shared.incr(key, value)
+                except ValueError:
+                    self.shared.set(key, value, None)
+
+    def shared_stats(self):
+        """Сумма счетчиков всех процессов, переданных в общий кэш."""
+        found = self.shared.get_many([STATS_KEY + name for name in STATS])
+        return {name: found.get(STATS_KEY + name, 0) for name in STATS}
+
+    def reset_stats(self):
+        self.shared.delete_many([STATS_KEY + name for name in STATS])
@@ -0,0 +1,10 @@
+def query_budget(limit):
+    """Объявляет максимум SQL-запросов на один запрос к view.
+
+    Бюджет не зависит от числа записей на странице, так что N+1
+    его превышает; соблюдение проверяют тесты.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
@@ -0,0 +1,75 @@
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache.sqlite import SQLiteCache
+
+BACKENDS = {
+    'locmem': lambda directory: LocMemCache('bench', {
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }),
+    'filebased': lambda directory: FileBasedCache(f'{directory}/files', {
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }),
+    'sqlite': lambda directory: SQLiteCache(f'{directory}/cache.sqlite3', {
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }),
+}
+VALUE = 'x' * 2000
+
+
+def worker(name, directory, keys, operations, seed):
+    """Чтение с заполнением при промахе, как у фрагментов шаблонов."""
+    cache = BACKENDS[name](directory)
+    rnd = random.Random(seed)
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(operations):
+        key = f'key{rnd.randrange(keys)}'
+        if cache.get(key) is None:
+            cache.set(key, VALUE, 300)
+        else:
+            hits += 1
+    return hits, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает кэш SQLite с LocMemCache и FileBasedCache при '
+        'нескольких процессах: операции в секунду и доля попаданий.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"бэкенд":<10} {"процессов":>9} {"оп/с":>10} {"попаданий":>10}'
+        )
+        for name in BACKENDS:
+            directory = tempfile.mkdtemp()
+            try:
+                with context.Pool(options['processes']) as pool:
+                    results = pool.starmap(worker, [
+                        (name, directory, options['keys'],
+                         options['operations'], seed)
+                        for seed in range(options['processes'])
+                    ])
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            hits = sum(hits for hits, _ in results)
+            elapsed = max(elapsed for _, elapsed in results)
+            total = options['operations'] * options['processes']
+            self.stdout.write(
+                f'{name:<10} {options["processes"]:>9} '
+                f'{total / elapsed:>10.0f} {hits / total:>10.1%}'
+            )
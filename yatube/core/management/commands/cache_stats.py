@@ -0,0 +1,31 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache.tiered import STATS, TieredCache
+
+
+class Command(BaseCommand):
+    help = (
+        'Попадания, промахи и вытеснения кэша в памяти процессов '
+        '(core.cache.tiered), сложенные по всем воркерам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='Обнулить счетчики.'
+        )
+
+    def handle(self, *args, **options):
+        cache = caches['default']
+        if not isinstance(cache, TieredCache):
+            raise CommandError('Кэш default — не core.cache.tiered.')
+        stats = cache.shared_stats()
+        for name in STATS:
+            self.stdout.write(f'{name:<14} {stats[name]:>10}')
+        local = stats['local_hits'] + stats['local_misses']
+        if local:
+            self.stdout.write(
+                f'{"local_ratio":<14} {stats["local_hits"] / local:>10.1%}'
+            )
+        if options['reset']:
+            cache.reset_stats()
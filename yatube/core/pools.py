@@ -0,0 +1,57 @@
+"""Пулы процессов spawn, создаваемые по первому требованию.
+
+ProcessPool держит один ProcessPoolExecutor на процесс: пул создается
+фабрикой при первой задаче и заново после fork (пул родителя в дочернем
+процессе недоступен) или после поломки (процесс пула убит). Фабрика
+вызывается только при создании пула, поэтому число процессов и
+аргументы инициализатора берутся из настроек на этот момент.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def spawn(workers, initializer=None, initargs=()):
+    """Пул из workers процессов spawn: fork не копирует состояние."""
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=initializer,
+        initargs=initargs
+    )
+
+
+class ProcessPool:
+    def __init__(self, factory):
+        self.factory = factory
+        self.executor = None
+        self.pid = None
+
+    def get(self, restart=False):
+        """Пул текущего процесса; restart создает его заново."""
+        if restart or self.executor is None or self.pid != os.getpid():
+            self.executor = self.factory()
+            self.pid = os.getpid()
+        return self.executor
+
+    def submit(self, fn, *args):
+        """Ставит задачу в пул; сломанный пул пересоздается один раз."""
+        try:
+            return self.get().submit(fn, *args)
+        except BrokenProcessPool:
+            return self.get(restart=True).submit(fn, *args)
+
+    def terminate(self):
+        """Останавливает процессы пула и бросает его.
+
+        Задачи, которые выполняются в пуле, прерываются; следующая
+        задача создаст новый пул.
+        """
+        stuck, self.executor = self.executor, None
+        # Пул родителя после fork не наш, его процессы не трогаем.
+        if stuck is None or self.pid != os.getpid():
+            return
+        for worker in list(stuck._processes.values()):
+            worker.terminate()
+        stuck.shutdown(wait=False)
@@ -0,0 +1,142 @@
+"""Файловое хранилище с адресацией по содержимому.
+
+Имя файла — SHA-256 его содержимого, разложенный по двум уровням
+каталогов: posts/photo.jpg сохраняется как posts/ab/cd/abcd….jpg.
+В одном каталоге остается не больше нескольких десятков файлов при
+любом их общем числе, а одинаковые загрузки получают одно имя и
+записываются на диск один раз. Файл сначала пишется во временный файл
+рядом и затем атомарно получает итоговое имя через os.link, поэтому
+параллельные загрузки одного содержимого не мешают друг другу.
+Связывание и delete_idle берут блокировку каталога файла: удаление не
+проходит между проверкой и повторной загрузкой того же содержимого.
+
+Сколько записей ссылается на файл, хранилище не знает: это ведут
+владельцы имен (см. posts.media).
+
+walk обходит любое хранилище Django в порядке сортировки имен, не
+собирая список всех файлов: так его можно сливать с отсортированной
+выборкой из базы.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+
+ADDRESSED_NAME = re.compile(
+    r'(?:^|/)(?P<shard>[0-9a-f]{2}/[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})'
+    r'(?:\.\w+)?$'
+)
+
+
+def addressed_name(name, digest):
+    """Имя по содержимому в каталоге исходного имени name."""
+    directory, basename = posixpath.split(name.replace('\\', '/'))
+    extension = os.path.splitext(basename)[1].lower()
+    return posixpath.join(
+        directory, digest[:2], digest[2:4], digest + extension
+    )
+
+
+def is_addressed(name):
+    """Имя уже выдано по содержимому и совпадает со своим каталогом."""
+    match = ADDRESSED_NAME.search(name or '')
+    return bool(match) and (
+        match['shard'] == f'{match["digest"][:2]}/{match["digest"][2:4]}'
+    )
+
+
+def walk(storage, directory=''):
+    """Имена всех файлов каталога и подкаталогов в порядке сортировки.
+
+    В памяти держится только содержимое текущих каталогов. Подкаталог
+    сортируется как «имя/»: все его файлы идут подряд и на своем месте
+    среди соседей (posts/ab.jpg < posts/ab/… < posts/ab0.jpg).
+    """
+    if directory and not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    entries = sorted(
+        [(f'{name}/', True) for name in directories]
+        + [(name, False) for name in files]
+    )
+    for name, is_directory in entries:
+        path = posixpath.join(directory, name)
+        if is_directory:
+            yield from walk(storage, path.rstrip('/'))
+        else:
+            yield path
+
+
+@contextlib.contextmanager
+def locked(directory):
+    """Блокировка каталога, общая для процессов и потоков."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя выбирает _save по содержимому; совпадение имен
+        # означает совпадение содержимого, и переименовывать нечего.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    output.write(chunk)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            name = addressed_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with locked(os.path.dirname(full_path)):
+                try:
+                    os.link(temporary, full_path)
+                except FileExistsError:
+                    # Файл снова нужен: сборщик мусора отсчитывает срок
+                    # ожидания заново.
+                    os.utime(full_path)
+        finally:
+            os.unlink(temporary)
+        return name
+
+    def touch(self, name):
+        """Отсчитывает срок ожидания сборщика мусора для name заново."""
+        full_path = self.path(name)
+        with locked(os.path.dirname(full_path)):
+            os.utime(full_path)
+
+    def delete_idle(self, name, grace):
+        """Удаляет файл, если его не сохраняли последние grace секунд.
+
+        Загрузка того же содержимого обновляет время файла под той же
+        блокировкой, поэтому файл, только что выданный новому посту,
+        остается на месте. Возвращает, удален ли файл.
+        """
+        full_path = self.path(name)
+        try:
+            with locked(os.path.dirname(full_path)):
+                if os.path.getmtime(full_path) > time.time() - grace:
+                    return False
+                os.unlink(full_path)
+        except FileNotFoundError:
+            return False
+        return True
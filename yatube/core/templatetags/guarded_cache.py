@@ -0,0 +1,59 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import guarded
+
+register = template.Library()
+
+
+class GuardedCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on, version):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on]
+        )
+        value, current = guarded.fetch_entry(
+            key,
+            lambda: self.nodelist.render(context),
+            int(self.timeout.resolve(context)),
+            version=self.version.resolve(context) if self.version else None,
+        )
+        if not current and 'request' in context:
+            # Страница собрана из фрагмента прежней версии: ее нельзя
+            # отдавать с валидаторами и класть в кэш страниц.
+            context['request'].served_stale = True
+        return value
+
+
+@register.tag
+def guarded_cache(parser, token):
+    """Как {% cache %}, но через core.cache.guarded: один пересчет на
+    истечение и прежний фрагмент, пока новый собирается.
+
+        {% guarded_cache 20 index_page request.get_full_path version=v %}
+          ...
+        {% endguarded_cache %}
+
+    Смена version не меняет ключ: до пересчета отдается прежний фрагмент,
+    а у запроса появляется served_stale (см. posts.page_cache).
+    """
+    nodelist = parser.parse(('endguarded_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]} требует срок и имя фрагмента'
+        )
+    version = None
+    if tokens[-1].startswith('version='):
+        version = parser.compile_filter(tokens.pop()[len('version='):])
+    return GuardedCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]], version
+    )
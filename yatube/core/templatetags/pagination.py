@@ -0,0 +1,26 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, size=2):
+    """Номера страниц для навигации: первая, последняя и size страниц
+    вокруг текущей. None на месте пропуска выводится многоточием.
+
+    Для 100 страниц и текущей 50: [1, None, 48, 49, 50, 51, 52, None, 100].
+    """
+    last = page.paginator.num_pages
+    numbers = sorted({1, last} | set(range(
+        max(1, page.number - size), min(last, page.number + size) + 1
+    )))
+    window, previous = [], 0
+    for number in numbers:
+        if number - previous == 2:
+            # Пропуск в одну страницу короче показать номером.
+            window.append(previous + 1)
+        elif number - previous > 2:
+            window.append(None)
+        window.append(number)
+        previous = number
+    return window
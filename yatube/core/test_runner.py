@@ -0,0 +1,37 @@
+"""Тесты с общим кэшем во временном файле.
+
+Тесты очищают кэш (cache.clear()), и с настройками сайта они стирали бы
+cache.sqlite3 работающего сервера. TEST_RUNNER для manage.py test,
+фикстура в tests/conftest.py — для pytest.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+def temporary_cache(directory):
+    """Настройки, переносящие общий кэш в каталог directory."""
+    return override_settings(CACHES={
+        **settings.CACHES,
+        'shared': {
+            **settings.CACHES['shared'],
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        },
+    })
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.mkdtemp()
+        self.cache_settings = temporary_cache(self.cache_directory)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,122 @@
+import multiprocessing
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import sqlite
+from core.cache.sqlite import SQLiteCache
+
+INCREMENTS = 200
+WORKERS = 4
+
+
+def increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.cache.set_many({'a': 1, 'b': 'b'})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 'b'}
+        )
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_shared_between_instances(self):
+        """Записи видны другим экземплярам (процессам) с тем же файлом."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_timeout(self):
+        self.cache.set('key', 'value', 0.2)
+        self.cache.set('forever', 'value', None)
+        self.assertFalse(self.cache.add('key', 'other'))
+        time.sleep(0.3)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'other'))
+        self.assertEqual(self.cache.get('key'), 'other')
+        self.assertTrue(self.cache.touch('forever', 0.2))
+        time.sleep(0.3)
+        self.assertFalse(self.cache.has_key('forever'))
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'text')
+        with self.assertRaises(TypeError):
+            self.cache.incr('text')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.location,))
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), WORKERS * INCREMENTS)
+
+    def test_lru_eviction_by_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        time.sleep(1.1)
+        cache.get('key0')
+        cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertEqual(cache.get('key10'), 10)
+        self.assertLessEqual(len(cache.get_many(
+            [f'key{i}' for i in range(11)]
+        )), 10)
+
+    def test_reads_are_written_in_batches(self):
+        """Время чтения копится в памяти и пишется пачкой."""
+        self.cache.set('key', 'value')
+        database = sqlite3.connect(self.location)
+        database.execute('UPDATE cache SET accessed = 0')
+        database.commit()
+
+        def accessed():
+            return database.execute('SELECT accessed FROM cache').fetchone()
+
+        self.cache.get('key')
+        self.assertEqual(accessed(), (0,))
+        with mock.patch.object(sqlite, 'ACCESS_FLUSH_INTERVAL', -1):
+            self.cache.get('key')
+        self.assertGreater(accessed()[0], 0)
+        database.close()
+
+    def test_eviction_by_size(self):
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key{i}', b'x' * 1000)
+        stored = cache.get_many([f'key{i}' for i in range(20)])
+        self.assertLessEqual(len(stored) * 1000, 10000)
+        self.assertIn('key19', stored)
@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import guarded
+
+KEY = 'guarded_test'
+THREADS = 8
+
+
+class GuardedFetchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def compute(self, delay=0.3):
+        with self.lock:
+            self.calls += 1
+        time.sleep(delay)
+        return 'new'
+
+    def store(self, value='old', version=None, expires_in=-1, delta=0):
+        cache.set(KEY, (value, version, time.time() + expires_in, delta), 60)
+
+    def fetch_concurrently(self):
+        barrier = threading.Barrier(THREADS)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(guarded.fetch(KEY, self.compute, 20))
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_recompute_per_expiry(self):
+        """Истекшее значение пересчитывает один поток, прочие берут старое."""
+        self.store()
+        results = self.fetch_concurrently()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(results), THREADS)
+        self.assertLessEqual(set(results), {'old', 'new'})
+        self.assertEqual(guarded.fetch(KEY, self.compute, 20), 'new')
+        self.assertEqual(self.calls, 1)
+
+    def test_cold_start_waits_for_first(self):
+        """Без значения остальные ждут результат первого."""
+        self.assertEqual(self.fetch_concurrently(), ['new'] * THREADS)
+        self.assertEqual(self.calls, 1)
+
+    def test_new_version_serves_previous_while_recomputing(self):
+        """Пока другой пересчитывает, отдается прежняя версия."""
+        self.store(version=1, expires_in=60)
+        cache.add(f'{KEY}:lock', 1)
+        self.assertEqual(
+            guarded.fetch_entry(KEY, self.compute, 20, version=2),
+            ('old', False)
+        )
+        self.assertEqual(self.calls, 0)
+
+    def test_lock_is_released_after_store(self):
+        """Блокировка снимается после записи значения и только своя."""
+        release = guarded._release
+
+        def check_and_release(lock_key, token):
+            self.assertEqual(cache.get(KEY)[0], 'new')
+            release(lock_key, token)
+
+        with mock.patch.object(guarded, '_release', check_and_release):
+            guarded.fetch(KEY, lambda: self.compute(0), 20)
+        self.assertIsNone(cache.get(f'{KEY}:lock'))
+
+        def expired():
+            # Своя блокировка истекла, и ее уже взял другой запрос.
+            cache.set(f'{KEY}:lock', 'other')
+            return 'new'
+
+        cache.clear()
+        guarded.fetch(KEY, expired, 20)
+        self.assertEqual(cache.get(f'{KEY}:lock'), 'other')
+
+    def test_locked_database_serves_stale(self):
+        """Занятая база не мешает отдать старое значение."""
+        def locked():
+            raise OperationalError('database is locked')
+
+        self.store()
+        self.assertEqual(guarded.fetch(KEY, locked, 20), 'old')
+        cache.clear()
+        with self.assertRaises(OperationalError):
+            guarded.fetch(KEY, locked, 20)
+
+    def test_early_recompute(self):
+        """Свежее значение пересчитывается заранее с учетом его цены."""
+        self.store(expires_in=1, delta=0.5)
+        with override_settings(CACHE_EARLY_BETA=0):
+            self.assertEqual(guarded.fetch(KEY, self.compute, 20), 'old')
+        with override_settings(CACHE_EARLY_BETA=1000):
+            self.assertEqual(guarded.fetch(KEY, self.compute, 20), 'new')
+        self.assertEqual(self.calls, 1)
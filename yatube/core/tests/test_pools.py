@@ -0,0 +1,40 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.pools import ProcessPool
+
+
+class ProcessPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = mock.Mock()
+        self.pool = ProcessPool(self.factory)
+
+    def test_pool_is_created_once_per_process(self):
+        """Пул создается при первой задаче и заново после fork."""
+        self.factory.assert_not_called()
+        first = self.pool.get()
+        self.assertIs(self.pool.get(), first)
+        self.assertEqual(self.factory.call_count, 1)
+        self.pool.pid = os.getpid() + 1
+        self.pool.get()
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_broken_pool_is_restarted(self):
+        """Задача в сломанный пул уходит в новый пул."""
+        broken, fresh = mock.Mock(), mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool
+        self.factory.side_effect = [broken, fresh]
+        self.assertIs(self.pool.submit(len, 'x'), fresh.submit.return_value)
+        fresh.submit.assert_called_once_with(len, 'x')
+
+    def test_foreign_pool_is_not_terminated(self):
+        """Процессы пула родителя после fork не останавливаются."""
+        parent = mock.Mock(_processes={1: mock.Mock()})
+        self.pool.executor, self.pool.pid = parent, os.getpid() + 1
+        self.pool.terminate()
+        self.assertIsNone(self.pool.executor)
+        parent._processes[1].terminate.assert_not_called()
+        parent.shutdown.assert_not_called()
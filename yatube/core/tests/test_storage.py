@@ -0,0 +1,59 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage, is_addressed, walk
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_name_is_sharded_content_hash(self):
+        """Имя — хеш содержимого в двух уровнях каталогов."""
+        digest = hashlib.sha256(b'image').hexdigest()
+        name = self.storage.save('posts/Photo.JPG', ContentFile(b'image'))
+        self.assertEqual(
+            name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertTrue(is_addressed(name))
+        self.assertFalse(is_addressed('posts/Photo.JPG'))
+        with self.storage.open(name) as saved:
+            self.assertEqual(saved.read(), b'image')
+
+    def test_identical_uploads_are_stored_once(self):
+        """Одинаковое содержимое получает одно имя и один файл."""
+        first = self.storage.save('posts/a.jpg', ContentFile(b'same'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'same'))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        files = [
+            name for _, _, names in os.walk(self.directory) for name in names
+        ]
+        self.assertEqual(len(files), 2)
+
+    def test_walk_yields_names_in_sorted_order(self):
+        """Обход хранилища идет в том же порядке, что и сортировка имен."""
+        names = [
+            'posts/ab.jpg', 'posts/ab/cd/1.jpg', 'posts/ab/2.jpg',
+            'posts/ab0.jpg', 'posts/b.jpg', 'cache/1.jpg',
+        ]
+        for name in names:
+            path = self.storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'wb').close()
+        self.assertEqual(list(walk(self.storage)), sorted(names))
+        self.assertEqual(
+            list(walk(self.storage, 'posts/ab')),
+            ['posts/ab/2.jpg', 'posts/ab/cd/1.jpg']
+        )
+        self.assertEqual(list(walk(self.storage, 'missing')), [])
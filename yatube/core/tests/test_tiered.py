@@ -0,0 +1,93 @@
+import time
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.cache.tiered import TieredCache
+
+CARD = 'post_card:1:100.0:00'
+
+
+class TieredCacheTests(SimpleTestCase):
+    # Другой процесс здесь — прямые записи в caches['shared'] в обход
+    # памяти этого процесса.
+
+    def setUp(self):
+        self.shared = caches['shared']
+        self.cache = self.make_cache()
+        self.cache.clear()
+        self.cache.flush_stats()
+        self.cache.reset_stats()
+
+    def make_cache(self, **options):
+        return TieredCache('shared', {
+            'KEY_PREFIX': 'tiered_test',
+            'OPTIONS': {
+                'MAX_ENTRIES': 3, 'LOCAL_TIMEOUT': 0.3, 'STATS_INTERVAL': 60,
+                **options
+            },
+        })
+
+    def test_local_hits_skip_shared(self):
+        self.cache.set(CARD, '<article>')
+        self.shared.clear()
+        self.assertEqual(self.cache.get(CARD), '<article>')
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_values_are_copies(self):
+        self.cache.set(CARD, ['card'])
+        self.cache.get(CARD).append('changed')
+        self.assertEqual(self.cache.get(CARD), ['card'])
+
+    def test_other_keys_always_read_shared(self):
+        """Ключи версий всегда свежие: через них идет инвалидация."""
+        self.cache.set('version:index', 1)
+        self.shared.incr('version:index')
+        self.assertEqual(self.cache.get('version:index'), 2)
+        self.assertEqual(self.cache.stats()['local_hits'], 0)
+
+    def test_other_process_changes_visible_after_timeout(self):
+        self.cache.set(CARD, 'old')
+        self.shared.set(CARD, 'new')
+        self.assertEqual(self.cache.get(CARD), 'old')
+        time.sleep(0.35)
+        self.assertEqual(self.cache.get(CARD), 'new')
+
+    def test_threads_share_process_memory(self):
+        """Экземпляры кэша разных потоков делят одну память процесса."""
+        self.cache.set(CARD, 'card')
+        self.assertEqual(self.make_cache().stats()['entries'], 1)
+
+    def test_lru_eviction(self):
+        for i in range(4):
+            self.cache.set(f'post_card:{i}', i)
+        self.cache.get('post_card:1')
+        self.cache.set('post_card:4', 4)
+        stats = self.cache.stats()
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(stats['entries'], 3)
+        # Вытесненные остались в общем кэше; 1 недавно читали.
+        self.assertEqual(self.cache.get_many(
+            ['post_card:0', 'post_card:1', 'post_card:2']
+        ), {'post_card:0': 0, 'post_card:1': 1, 'post_card:2': 2})
+        stats = self.cache.stats()
+        self.assertEqual(stats['local_hits'], 2)
+        self.assertEqual(stats['shared_hits'], 2)
+
+    def test_stats_are_summed_in_shared_cache(self):
+        self.cache.set(CARD, 'card')
+        self.cache.get(CARD)
+        self.cache.get('post_card:missing')
+        self.cache.flush_stats()
+        self.cache.get(CARD)
+        self.cache.flush_stats()
+        stats = self.cache.shared_stats()
+        self.assertEqual(stats['local_hits'], 2)
+        self.assertEqual(stats['local_misses'], 1)
+        self.assertEqual(stats['shared_misses'], 1)
+        output = StringIO()
+        call_command('cache_stats', '--reset', stdout=output)
+        self.assertIn('local_hits', output.getvalue())
+        self.assertEqual(self.cache.shared_stats()['local_hits'], 0)
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'attempts',
+        'available_at',
+        'failed_at',
+    )
+    list_filter = ('name', 'failed_at')
+    # Аргументы задачи исполняет воркер: правятся только новые задачи
+    # через код.
+    readonly_fields = ('payload',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+
+    def ready(self):
+        # Задачи объявляются в модулях jobs приложений (posts/jobs.py):
+        # воркер должен знать их все.
+        autodiscover_modules('jobs')
+        from . import mail  # noqa: F401
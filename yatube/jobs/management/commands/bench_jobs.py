@@ -0,0 +1,77 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from jobs import queue
+from jobs.models import Job
+
+
+def drain(batch_size):
+    """Выполняет задачи, пока очередь не опустеет; возвращает их число."""
+    done = 0
+    while True:
+        succeeded, leased = queue.work(batch_size, 60)
+        if not leased:
+            connections.close_all()
+            return done
+        done += succeeded
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность очереди задач: постановку по '
+        'одной задаче на транзакцию, как из представлений, и выполнение '
+        'пустых задач при разных размерах пачки и числе воркеров. '
+        'Работает с базой проекта; свои задачи удаляет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=2000)
+        parser.add_argument(
+            '--batch-sizes', type=int, nargs='+', default=[1, 10, 50]
+        )
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 4]
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.stdout.write(
+                f'постановка: {self.enqueue(options["jobs"]):.0f} задач/с'
+            )
+            Job.objects.filter(name=queue.noop.job_name).delete()
+            self.stdout.write(
+                f'{"воркеров":>8} {"пачка":>6} {"задач/с":>10}'
+            )
+            for workers in options['workers']:
+                for batch_size in options['batch_sizes']:
+                    rate = self.run(options['jobs'], workers, batch_size)
+                    self.stdout.write(
+                        f'{workers:>8} {batch_size:>6} {rate:>10.0f}'
+                    )
+        finally:
+            Job.objects.filter(name=queue.noop.job_name).delete()
+
+    def enqueue(self, count):
+        start = time.perf_counter()
+        for number in range(count):
+            with transaction.atomic():
+                queue.noop.delay(number)
+        return count / (time.perf_counter() - start)
+
+    def run(self, count, workers, batch_size):
+        Job.objects.bulk_create(
+            Job(name=queue.noop.job_name, max_attempts=1)
+            for _ in range(count)
+        )
+        # Дочерние процессы не должны делить соединение родителя.
+        connections.close_all()
+        start = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            done = sum(pool.map(drain, [batch_size] * workers))
+        elapsed = time.perf_counter() - start
+        if done != count:
+            self.stderr.write(f'Выполнено {done} задач из {count}')
+        return done / elapsed
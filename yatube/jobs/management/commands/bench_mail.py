@@ -0,0 +1,102 @@
+import statistics
+import time
+
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+from jobs.smtp_sink import SMTPSink
+from posts.models import User
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+QUEUED_BACKEND = 'jobs.mail.QueuedEmailBackend'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку password_reset при отправке письма прямо из '
+        'запроса и через очередь, а также доставку воркером пачками и по '
+        'одному письму. Письма принимает локальный SMTP-сервер с '
+        'задержкой; данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument(
+            '--delay', type=float, default=0.2,
+            help='Сколько секунд сервер отвечает на каждое письмо'
+        )
+        parser.add_argument('--batch-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            with transaction.atomic(), SMTPSink(options['delay']) as sink, \
+                    override_settings(
+                        EMAIL_HOST='127.0.0.1', EMAIL_PORT=sink.port,
+                        QUEUED_EMAIL_BACKEND=SMTP_BACKEND
+            ):
+                User.objects.create_user(
+                    username='bench-mail', email='bench-mail@example.com',
+                    password='bench-mail'
+                )
+                self.stdout.write(
+                    f'{"отправка":<10} {"медиана, мс":>12} {"p95, мс":>9}'
+                )
+                for label, backend in (
+                    ('из запроса', SMTP_BACKEND), ('очередь', QUEUED_BACKEND)
+                ):
+                    with override_settings(EMAIL_BACKEND=backend):
+                        self.requests(label)
+                # Письма из замера запросов в замер доставки не входят.
+                Job.objects.all().delete()
+                self.stdout.write(
+                    f'{"пачка":>6} {"писем/с":>9} {"соединений":>11}'
+                )
+                for batch_size in (1, options['batch_size']):
+                    self.deliver(sink, batch_size)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def requests(self, label):
+        client = Client()
+        url = reverse('users:password_reset')
+        timings = []
+        for _ in range(self.options['requests']):
+            start = time.perf_counter()
+            client.post(url, {'email': 'bench-mail@example.com'})
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:<10} {statistics.median(timings):>12.1f} {p95:>9.1f}'
+        )
+
+    def deliver(self, sink, batch_size):
+        with override_settings(EMAIL_BACKEND=QUEUED_BACKEND):
+            for number in range(self.options['requests']):
+                send_mail(f'Письмо {number}', 'Текст', None, [
+                    'bench-mail@example.com'
+                ])
+        connections, delivered = sink.connections, 0
+        start = time.perf_counter()
+        while True:
+            done, leased = queue.work(batch_size, 60)
+            if not leased:
+                break
+            delivered += done
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{batch_size:>6} {delivered / elapsed:>9.1f} '
+            f'{sink.connections - connections:>11}'
+        )
@@ -0,0 +1,55 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди задач: арендует задачи пачками и выполняет их. '
+        'Несколько воркеров можно запускать параллельно. SIGTERM и '
+        'Ctrl+C завершают воркер после текущей пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.JOBS_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--lease-timeout', type=int, default=settings.JOBS_LEASE_TIMEOUT,
+            help='Через сколько секунд невыполненную задачу получит '
+                 'другой воркер'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Сколько секунд ждать, если очередь пуста'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда очередь опустеет'
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+        done = failed = 0
+        while not self.stopping:
+            succeeded, leased = queue.work(
+                options['batch_size'], options['lease_timeout']
+            )
+            done += succeeded
+            failed += leased - succeeded
+            if leased:
+                continue
+            if options['burst']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
+
+    def stop(self, signum, frame):
+        self.stopping = True
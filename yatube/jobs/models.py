@@ -0,0 +1,37 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Отложенный вызов задачи, хранящийся в базе проекта.
+
+    Пока задачу выполняет воркер, available_at сдвинут на время аренды
+    и lease хранит ключ аренды; выполненная задача удаляется, а
+    исчерпавшая попытки остается с failed_at и текстом ошибки.
+    """
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='[[], {}]')
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток')
+    available_at = models.DateTimeField('Доступна с', default=timezone.now)
+    lease = models.CharField('Аренда', max_length=32, blank=True)
+    error = models.TextField('Последняя ошибка', blank=True)
+    failed_at = models.DateTimeField('Провалена', null=True, blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        ordering = ('available_at', 'id')
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Очередь задач'
+        # Воркер выбирает только живые задачи по времени доступности.
+        indexes = (
+            models.Index(
+                fields=('available_at', 'id'),
+                condition=Q(failed_at__isnull=True),
+                name='job_ready'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,166 @@
+"""Очередь задач в базе проекта, без внешнего брокера.
+
+Задача — функция, объявленная декоратором job в модуле jobs
+приложения:
+
+    @job(max_attempts=3)
+    def notify(comment_id):
+        ...
+
+    notify.delay(comment.pk)
+
+delay пишет строку Job в текущей транзакции: задача появится в очереди,
+только если транзакция представления зафиксируется. Воркер
+(manage.py run_jobs) арендует пачку задач одним условным UPDATE:
+available_at сдвигается на время аренды, и другие воркеры эти строки
+не видят. Задача выполняется в своей транзакции вместе с удалением
+своей строки; если аренда истекла и задачу уже забрал другой воркер,
+транзакция откатывается. Упавшая задача возвращается в очередь с
+экспоненциальной задержкой, после max_attempts попыток остается с
+failed_at. Побочные эффекты вне базы (письма) выполняются хотя бы раз,
+но при истечении аренды могут повториться.
+
+Задача с batched=True получает сразу все свои задачи из арендованной
+пачки — список аргументов вызовов — и возвращает для каждого None или
+текст ошибки: так письма пачки уходят через одно соединение.
+"""
+import json
+import traceback
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+REGISTRY = {}
+BATCHED = set()
+
+
+class LeaseLost(Exception):
+    """Аренда задачи истекла, и ее забрал другой воркер."""
+
+
+def job(max_attempts=None, batched=False):
+    """Объявляет функцию задачей; у нее появляется метод delay."""
+    def decorator(function):
+        name = f'{function.__module__}.{function.__name__}'
+        REGISTRY[name] = function
+        if batched:
+            BATCHED.add(name)
+
+        @wraps(function)
+        def delay(*args, **kwargs):
+            return enqueue(name, *args, max_attempts=max_attempts, **kwargs)
+
+        function.job_name = name
+        function.delay = delay
+        return function
+    return decorator
+
+
+def enqueue(name, *args, max_attempts=None, **kwargs):
+    """Ставит задачу name в очередь; аргументы должны быть JSON."""
+    return Job.objects.create(
+        name=name,
+        payload=json.dumps([args, kwargs]),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def lease(batch_size, timeout):
+    """Арендует до batch_size доступных задач на timeout секунд."""
+    now = timezone.now()
+    ids = list(Job.objects.filter(
+        failed_at__isnull=True, available_at__lte=now
+    ).values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Условие повторяется в UPDATE: из двух воркеров, выбравших одни и
+    # те же строки, строку получит только первый.
+    Job.objects.filter(
+        pk__in=ids, failed_at__isnull=True, available_at__lte=now
+    ).update(
+        lease=token,
+        available_at=now + timedelta(seconds=timeout),
+        attempts=F('attempts') + 1
+    )
+    return list(Job.objects.filter(pk__in=ids, lease=token))
+
+
+def run(leased):
+    """Выполняет арендованную задачу; возвращает True при успехе."""
+    try:
+        with transaction.atomic():
+            args, kwargs = json.loads(leased.payload)
+            REGISTRY[leased.name](*args, **kwargs)
+            deleted, _ = Job.objects.filter(
+                pk=leased.pk, lease=leased.lease
+            ).delete()
+            if not deleted:
+                raise LeaseLost
+    except LeaseLost:
+        return False
+    except Exception:
+        fail(leased, traceback.format_exc())
+        return False
+    return True
+
+
+def run_batch(name, leased):
+    """Выполняет пачку задач batched одним вызовом; возвращает успехи."""
+    try:
+        errors = REGISTRY[name]([
+            json.loads(item.payload)[0] for item in leased
+        ])
+    except Exception:
+        errors = [traceback.format_exc()] * len(leased)
+    done = [item for item, error in zip(leased, errors) if error is None]
+    for item, error in zip(leased, errors):
+        if error is not None:
+            fail(item, error)
+    # Вся пачка арендована одним ключом.
+    Job.objects.filter(
+        pk__in=[item.pk for item in done], lease=leased[0].lease
+    ).delete()
+    return len(done)
+
+
+def fail(leased, error):
+    """Возвращает задачу в очередь с задержкой или помечает проваленной."""
+    now = timezone.now()
+    changes = {'lease': '', 'error': error}
+    if leased.attempts >= leased.max_attempts:
+        changes['failed_at'] = now
+    else:
+        changes['available_at'] = now + timedelta(
+            seconds=settings.JOBS_RETRY_DELAY * 2 ** (leased.attempts - 1)
+        )
+    Job.objects.filter(pk=leased.pk, lease=leased.lease).update(**changes)
+
+
+def work(batch_size=None, timeout=None):
+    """Арендует и выполняет одну пачку; возвращает (выполнено, всего)."""
+    leased = lease(
+        batch_size or settings.JOBS_BATCH_SIZE,
+        timeout or settings.JOBS_LEASE_TIMEOUT
+    )
+    done, batches = 0, {}
+    for item in leased:
+        if item.name in BATCHED:
+            batches.setdefault(item.name, []).append(item)
+        else:
+            done += run(item)
+    for name, items in batches.items():
+        done += run_batch(name, items)
+    return done, len(leased)
+
+
+@job()
+def noop(*args):
+    """Пустая задача для замеров пропускной способности (bench_jobs)."""
@@ -0,0 +1,72 @@
+"""Локальный SMTP-сервер, который принимает письма и ничего не отправляет.
+
+Нужен тестам и замеру bench_mail вместо настоящего почтового
+сервера. delay задерживает ответ на каждое письмо — так изображается
+медленный почтовый сервер.
+
+    with SMTPSink(delay=0.2) as sink:
+        ... EMAIL_HOST='127.0.0.1', EMAIL_PORT=sink.port ...
+    sink.messages, sink.connections
+"""
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        self.reply('220 smtp-sink')
+        for raw in self.rfile:
+            command = raw.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250 smtp-sink')
+            elif command.startswith('DATA'):
+                self.reply('354 end with .')
+                self.receive(sink)
+            elif command.startswith('QUIT'):
+                self.reply('221 bye')
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+    def receive(self, sink):
+        lines = []
+        for raw in self.rfile:
+            if raw in (b'.\r\n', b'.\n'):
+                break
+            lines.append(raw[1:] if raw.startswith(b'..') else raw)
+        time.sleep(sink.delay)
+        with sink.lock:
+            sink.messages.append(b''.join(lines))
+        self.reply('250 queued')
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPSink:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = _Server(('127.0.0.1', 0), _Handler)
+        self.server.sink = self
+        self.port = self.server.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,75 @@
+import json
+import socket
+
+from django.core.mail import send_mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+from jobs.smtp_sink import SMTPSink
+from posts.models import User
+
+QUEUED = {
+    'EMAIL_BACKEND': 'jobs.mail.QueuedEmailBackend',
+    'QUEUED_EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+    'EMAIL_HOST': '127.0.0.1',
+}
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@override_settings(**QUEUED)
+class QueuedEmailTests(TestCase):
+    def test_password_reset_is_delivered_by_worker(self):
+        """Восстановление пароля не ждет почтовый сервер."""
+        User.objects.create_user(
+            username='reader', email='reader@example.com', password='x'
+        )
+        with SMTPSink() as sink, override_settings(EMAIL_PORT=sink.port):
+            response = Client().post(
+                reverse('users:password_reset'),
+                {'email': 'reader@example.com'}
+            )
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(sink.messages, [])
+            self.assertEqual(queue.work(), (1, 1))
+        self.assertEqual(len(sink.messages), 1)
+        self.assertIn(b'reader@example.com', sink.messages[0])
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем уходит через одно соединение."""
+        for number in range(3):
+            send_mail(f'Письмо {number}', 'Текст', None, ['a@example.com'])
+        with SMTPSink() as sink, override_settings(EMAIL_PORT=sink.port):
+            self.assertEqual(queue.work(), (3, 3))
+        self.assertEqual(len(sink.messages), 3)
+        self.assertEqual(sink.connections, 1)
+
+    def test_payload_is_plain_data(self):
+        """В задаче — отправитель, получатели и текст письма, не pickle."""
+        send_mail('Письмо', 'Текст', 'from@example.com', ['a@example.com'])
+        from_email, recipients, data = json.loads(
+            Job.objects.get().payload
+        )[0]
+        self.assertEqual(from_email, 'from@example.com')
+        self.assertEqual(recipients, ['a@example.com'])
+        with SMTPSink() as sink, override_settings(EMAIL_PORT=sink.port):
+            self.assertEqual(queue.work(), (1, 1))
+        self.assertIn(b'Subject: =?utf-8?b?', sink.messages[0])
+
+    @override_settings(JOBS_RETRY_DELAY=0)
+    def test_unreachable_server_is_retried(self):
+        """Если сервер недоступен, письмо остается в очереди."""
+        send_mail('Письмо', 'Текст', None, ['a@example.com'])
+        with override_settings(EMAIL_PORT=free_port()):
+            self.assertEqual(queue.work(), (0, 1))
+        retried = Job.objects.get()
+        self.assertIn('Нет соединения', retried.error)
+        with SMTPSink() as sink, override_settings(EMAIL_PORT=sink.port):
+            self.assertEqual(queue.work(), (1, 1))
+        self.assertEqual(len(sink.messages), 1)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+
+calls = []
+
+
+@queue.job(max_attempts=2)
+def record(value):
+    calls.append(value)
+    if value == 'ошибка':
+        raise ValueError(value)
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_is_enqueued_with_transaction(self):
+        """Задача откатывается вместе с транзакцией, где ее поставили."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            record.delay('откат')
+            raise RuntimeError
+        record.delay('готово')
+        self.assertEqual(queue.work(), (1, 1))
+        self.assertEqual(calls, ['готово'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_leased_jobs_are_hidden_until_timeout(self):
+        """Арендованную задачу другой воркер получит только после аренды."""
+        for value in range(3):
+            record.delay(value)
+        first = queue.lease(batch_size=2, timeout=60)
+        self.assertEqual(len(first), 2)
+        second = queue.lease(batch_size=10, timeout=60)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(queue.lease(batch_size=10, timeout=60), [])
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch.object(timezone, 'now', return_value=later):
+            again = queue.lease(batch_size=10, timeout=60)
+        self.assertEqual(len(again), 3)
+        # Первая аренда истекла: ее выполнение откатывается.
+        self.assertFalse(queue.run(first[0]))
+        self.assertTrue(queue.run(again[0]))
+
+    @override_settings(JOBS_RETRY_DELAY=10)
+    def test_failed_job_is_retried_then_kept(self):
+        """Упавшая задача повторяется с задержкой, затем остается."""
+        record.delay('ошибка')
+        self.assertEqual(queue.work(), (0, 1))
+        retried = Job.objects.get()
+        self.assertIsNone(retried.failed_at)
+        self.assertIn('ValueError', retried.error)
+        self.assertGreater(
+            retried.available_at, timezone.now() + timedelta(seconds=9)
+        )
+        later = timezone.now() + timedelta(seconds=11)
+        with mock.patch.object(timezone, 'now', return_value=later):
+            self.assertEqual(queue.work(), (0, 1))
+        failed = Job.objects.get()
+        self.assertEqual(failed.attempts, 2)
+        self.assertIsNotNone(failed.failed_at)
+        self.assertEqual(queue.work(), (0, 0))
+
+    def test_worker_command_drains_queue(self):
+        """run_jobs --burst выполняет задачи пачками и выходит."""
+        for value in range(5):
+            record.delay(value)
+        call_command('run_jobs', burst=True, batch_size=2, stdout=mock.Mock())
+        self.assertEqual(calls, list(range(5)))
+        self.assertFalse(Job.objects.exists())
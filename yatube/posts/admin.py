@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Post, Group, Follow
 
 admin.site.register(Group)
@@ -18,6 +19,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице — полнотекстовый индекс.
+        expression = search.match_expression(search_term)
+        if not expression or not search.available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=search.matching_ids(expression)), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,160 @@
+"""Индексы автодополнения по началу адреса группы и имени пользователя.
+
+Индекс — отсортированный список кортежей (ключ, pk, значение, подпись),
+где ключ — значение в нижнем регистре; все записи с нужным началом идут
+подряд, и поиск — это bisect плюс проход по соседним записям. Список
+живет в памяти процесса и строится одним запросом при первом обращении.
+
+Изменения, сделанные в этом же процессе, вносятся в список на месте,
+а версия индекса в общем кэше поднимается; само изменение (pk и новые
+значения полей) ложится в общий кэш под ключом этой версии. Процесс,
+чья версия отстала, при следующем поиске применяет пропущенные
+изменения по этому журналу и строит индекс заново, только если журнал
+неполон или отставание больше AUTOCOMPLETE_CHANGELOG_SIZE. Как и для
+лент, версия поднимается еще раз после коммита, чтобы никто не остался
+с индексом, собранным до коммита.
+Запись из откаченной транзакции может остаться подсказкой до ближайшего
+перестроения; выбор такой подсказки отклонит проверка формы.
+
+Те же индексы отвечают на точный вопрос «какой pk у группы с этим
+адресом» (find) — без запроса к базе, например для условных GET.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from . import versions
+from .models import Group
+
+
+class PrefixIndex:
+    def __init__(self, name, model, key, label_fields, label):
+        self.name = name
+        self.model = model
+        self.fields = (key, *label_fields)
+        self.label = label
+        self.entries = None
+        self.by_pk = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def entry(self, pk, value, *label_values):
+        return (value.lower(), pk, value, self.label(value, *label_values))
+
+    def load(self, version):
+        entries = sorted(
+            self.entry(*row) for row in self.model.objects.values_list(
+                'pk', *self.fields
+            ).iterator()
+        )
+        self.entries = entries
+        self.by_pk = {entry[1]: entry for entry in entries}
+        self.version = version
+
+    def search(self, prefix, limit=None):
+        """Первые limit записей, ключ которых начинается с prefix."""
+        limit = limit or settings.AUTOCOMPLETE_LIMIT
+        prefix = prefix.strip().lower()
+        found = []
+        with self.lock:
+            self._refresh()
+            index = bisect_left(self.entries, (prefix,))
+            while index < len(self.entries) and len(found) < limit:
+                key, pk, value, label = self.entries[index]
+                if not key.startswith(prefix):
+                    break
+                found.append({'id': pk, 'value': value, 'label': label})
+                index += 1
+        return found
+
+    def find(self, value):
+        """pk записи с ключом ровно value или None — без запроса к базе."""
+        key = value.lower()
+        with self.lock:
+            self._refresh()
+            index = bisect_left(self.entries, (key,))
+            while index < len(self.entries) and self.entries[index][0] == key:
+                if self.entries[index][2] == value:
+                    return self.entries[index][1]
+                index += 1
+        return None
+
+    def _refresh(self):
+        version = versions.get('autocomplete', self.name)
+        if self.entries is not None and self.version == version:
+            return
+        if self.entries is None or not self._replay(version):
+            self.load(version)
+
+    def _change_key(self, version):
+        return f'autocomplete_change:{self.name}:{version}'
+
+    def _replay(self, version):
+        """Применяет изменения других процессов до version по журналу."""
+        missed = range(self.version + 1, version + 1)
+        if not 0 < len(missed) <= settings.AUTOCOMPLETE_CHANGELOG_SIZE:
+            return False
+        keys = [self._change_key(missed_version) for missed_version in missed]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        for key in keys:
+            self._apply(*changes[key])
+        self.version = version
+        return True
+
+    def _apply(self, pk, values):
+        """Заменяет запись pk; values=None — запись удалена."""
+        old = self.by_pk.pop(pk, None)
+        if old is not None:
+            del self.entries[bisect_left(self.entries, old)]
+        if values is not None:
+            entry = self.entry(pk, *values)
+            insort(self.entries, entry)
+            self.by_pk[pk] = entry
+
+    def _bump_version(self, pk, values):
+        version = versions.bump('autocomplete', self.name)
+        cache.set(
+            self._change_key(version), (pk, values),
+            settings.AUTOCOMPLETE_CHANGELOG_TIMEOUT
+        )
+        with self.lock:
+            # Версия выросла ровно на наш шаг: индекс по-прежнему точен.
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def changed(self, instance, update_fields=None):
+        if update_fields and not set(update_fields) & set(self.fields):
+            return
+        self._publish(instance.pk, tuple(
+            getattr(instance, field) for field in self.fields
+        ))
+
+    def removed(self, instance):
+        self._publish(instance.pk, None)
+
+    def _publish(self, pk, values):
+        with self.lock:
+            if self.entries is not None:
+                self._apply(pk, values)
+        self._bump_version(pk, values)
+        transaction.on_commit(lambda: self._bump_version(pk, values))
+
+
+def user_label(username, first_name, last_name):
+    return f'{first_name} {last_name}'.strip() or username
+
+
+GROUPS = PrefixIndex(
+    'groups', Group, 'slug', ('title',), lambda slug, title: title
+)
+USERS = PrefixIndex(
+    'users', get_user_model(), 'username', ('first_name', 'last_name'),
+    user_label
+)
+INDEXES = {index.name: index for index in (GROUPS, USERS)}
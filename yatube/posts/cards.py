@@ -0,0 +1,54 @@
+"""Кэш отрисованных карточек постов.
+
+Карточка (posts/includes/post.html) зависит только от самого поста,
+поэтому ее HTML кэшируется по ключу из id поста и времени его последнего
+изменения: правка или смена группы меняет ключ, и старая карточка
+просто перестает читаться. Карточки страницы достаются одним get_many,
+отрисовываются только промахи, и они же записываются одним set_many;
+миниатюры для промахов тоже читаются заранее одним пакетом.
+Переименование группы или автора ключ не меняет — такие карточки
+обновятся по истечении POST_CARD_TIMEOUT.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails
+
+TEMPLATE = 'posts/includes/post.html'
+
+
+def card_key(post, hide_author=False, hide_group=False):
+    return (
+        f'post_card:{post.pk}:{post.updated.timestamp()}:'
+        f'{int(hide_author)}{int(hide_group)}'
+    )
+
+
+def render_cards(posts, hide_author=False, hide_group=False):
+    """HTML карточек постов в том же порядке, что и posts."""
+    posts = {card_key(post, hide_author, hide_group): post for post in posts}
+    cards = cache.get_many(posts)
+    images = [
+        post.image for key, post in posts.items()
+        if key not in cards and post.image
+    ]
+    with thumbnails.prefetch(images):
+        missing = {
+            key: render_to_string(TEMPLATE, {
+                'post': post,
+                'hide_author': hide_author,
+                'hide_group': hide_group,
+            })
+            for key, post in posts.items() if key not in cards
+        }
+        # Карточка с исходной картинкой вместо миниатюры не кэшируется:
+        # миниатюра вот-вот появится.
+        cacheable = {
+            key: card for key, card in missing.items()
+            if not posts[key].image or thumbnails.ready(posts[key].image)
+        }
+    if cacheable:
+        cache.set_many(cacheable, settings.POST_CARD_TIMEOUT)
+    cards.update(missing)
+    return [cards[key] for key in posts]
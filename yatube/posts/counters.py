@@ -0,0 +1,98 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Post, UserStats
+
+
+def bump(user_id, **deltas):
+    """Сдвигает счетчики пользователя: bump(pk, posts_count=1).
+
+    Недостающую строку не создаем: ее досчитают get_stats или
+    reconcile_counters. Значение не опускается ниже нуля.
+    """
+    UserStats.objects.filter(user_id=user_id).update(**{
+        name: Greatest(F(name) + delta, Value(0))
+        for name, delta in deltas.items()
+    })
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, Value(0))
+    )
+
+
+def get_stats(user):
+    """Счетчики пользователя; недостающая строка создается на лету."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        reconcile(user_ids=[user.pk])
+        user.stats = UserStats.objects.get(user_id=user.pk)
+        return user.stats
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), Value(0))
+
+
+def reconcile(user_ids=None, apps=global_apps):
+    """Пересчитывает счетчики по данным и чинит расхождения.
+
+    Возвращает число исправленных строк. apps позволяет вызывать
+    функцию из миграций с историческими моделями.
+    """
+    User = apps.get_model('auth', 'User')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk)
+            for pk in users.filter(stats__isnull=True).values_list(
+                'pk', flat=True
+            ).iterator()
+        ),
+        ignore_conflicts=True
+    )
+    fixed = 0
+    actual = users.annotate(
+        actual_posts=_count(Post, 'author'),
+        actual_comments=_count(Comment, 'author'),
+        actual_followers=_count(Follow, 'author'),
+        actual_following=_count(Follow, 'user'),
+    ).exclude(
+        stats__posts_count=F('actual_posts'),
+        stats__comments_count=F('actual_comments'),
+        stats__followers_count=F('actual_followers'),
+        stats__following_count=F('actual_following'),
+    ).values_list(
+        'pk', 'actual_posts', 'actual_comments',
+        'actual_followers', 'actual_following'
+    )
+    for pk, posts, comments, followers, following in actual.iterator():
+        fixed += UserStats.objects.filter(user_id=pk).update(
+            posts_count=posts,
+            comments_count=comments,
+            followers_count=followers,
+            following_count=following,
+        )
+    if user_ids is not None:
+        return fixed
+    for pk, comments in Post.objects.annotate(
+        actual_comments=_count(Comment, 'post')
+    ).exclude(
+        comments_count=F('actual_comments')
+    ).values_list('pk', 'actual_comments').iterator():
+        fixed += Post.objects.filter(pk=pk).update(comments_count=comments)
+    return fixed
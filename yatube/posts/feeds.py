@@ -0,0 +1,171 @@
+"""Лента подписок: гибрид раскладки при записи и слияния при чтении.
+
+Посты обычных авторов раскладываются по лентам подписчиков (Timeline)
+при публикации. Посты авторов, у которых подписчиков больше
+FEED_PUSH_THRESHOLD, не раскладываются: при чтении ленты они берутся
+из индекса (author, pub_date, id) по потоку на автора и сливаются
+с материализованной лентой через k-way merge на куче.
+
+Когда после отписки у автора остается ровно FEED_PUSH_THRESHOLD
+подписчиков, его посты снова раскладываются при записи, а уже
+опубликованные restore доносит в ленты всех подписчиков (задача
+posts.jobs.restore_author). Разошедшиеся счетчики чинит команда
+backfill_timeline.
+"""
+import heapq
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import versions
+from .models import Follow, Post, Timeline, UserStats
+from .paginators import PREVIOUS, CursorPaginator
+
+
+def _entry(post, user_id):
+    return Timeline(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def _insert_in_batches(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == settings.TIMELINE_BATCH_SIZE:
+            Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def delete_in_batches(queryset):
+    """Удаляет записи ленты пачками, не держа в памяти весь набор."""
+    while True:
+        ids = list(queryset.order_by().values_list(
+            'pk', flat=True
+        )[:settings.TIMELINE_BATCH_SIZE])
+        if not ids:
+            return
+        Timeline.objects.filter(pk__in=ids).delete()
+
+
+def is_pulled(author_id):
+    """У автора больше FEED_PUSH_THRESHOLD подписчиков."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_PUSH_THRESHOLD
+    ).exists()
+
+
+def followers_count(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def pulled_authors(user):
+    """Авторы из подписок user, чьи посты читаются при чтении ленты."""
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FEED_PUSH_THRESHOLD
+    ).values_list('author_id', flat=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    _insert_in_batches(
+        _entry(post, user_id)
+        for user_id in Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True).iterator()
+    )
+
+
+def follow(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_pulled(author_id):
+        return
+    _insert_in_batches(
+        _entry(post, user_id)
+        for post in Post.objects.filter(author_id=author_id).only(
+            'pk', 'author_id', 'pub_date'
+        ).iterator()
+    )
+
+
+def restore(author_id):
+    """Доносит посты автора, опустившегося до порога, в ленты подписчиков.
+
+    Пока автор был выше порога, его посты не раскладывались, а новым
+    подписчикам не добавлялись и старые.
+    """
+    for user_id in Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator():
+        follow(user_id, author_id)
+        versions.bump('feed', user_id)
+
+
+def unfollow(user_id, author_id):
+    delete_in_batches(
+        Timeline.objects.filter(user_id=user_id, author_id=author_id)
+    )
+
+
+def remove_post(post):
+    delete_in_batches(Timeline.objects.filter(post_id=post.pk))
+
+
+def follow_posts(user):
+    """Лента подписок одним запросом — для старых ссылок с ?page=."""
+    return Post.objects.select_related('author', 'group').filter(
+        Q(pk__in=user.timeline.values('post_id'))
+        | Q(author_id__in=pulled_authors(user))
+    )
+
+
+class FeedPaginator(CursorPaginator):
+    """Лента подписок по курсору: Timeline плюс потоки популярных авторов."""
+
+    def __init__(self, user, per_page, **kwargs):
+        self.pulled = list(pulled_authors(user))
+        super().__init__(
+            user.timeline.exclude(
+                author_id__in=self.pulled
+            ).select_related('post__author', 'post__group'),
+            per_page,
+            keys=('pub_date', 'post_id'),
+            **kwargs
+        )
+
+    def items(self, direction, values):
+        streams = [
+            [entry.post for entry in super().items(direction, values)]
+        ] + [
+            self.fetch(
+                Post.objects.select_related('author', 'group').filter(
+                    author_id=author_id
+                ),
+                ('pub_date', 'pk'), direction, values
+            )
+            for author_id in self.pulled
+        ]
+        return list(islice(
+            heapq.merge(
+                *streams,
+                key=attrgetter('pub_date', 'pk'),
+                reverse=direction != PREVIOUS
+            ),
+            self.per_page + 1
+        ))
+
+    def key(self, post):
+        return [post.pub_date, post.pk]
@@ -1,13 +1,18 @@
 from .models import Comment, Post
+from .uploads import process
+from .widgets import AutocompleteSelect
 
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm
 
 
 class PostForm(ModelForm):
+    """Форма поста; картинка проверяется и нормализуется в пуле uploads."""
 
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        widgets = {'group': AutocompleteSelect('groups')}
         labels = {
             'text': 'Введите текст',
             'group': 'Выберите нужную группу',
@@ -19,6 +24,19 @@ class PostForm(ModelForm):
             'group': 'Группа поста',
         }
 
+    def full_clean(self):
+        error = None
+        if self.is_bound and self.files.get('image'):
+            self.files = self.files.copy()
+            try:
+                self.files['image'] = process(self.files['image'])
+            except ValidationError as rejected:
+                error = rejected
+                del self.files['image']
+        super().full_clean()
+        if error is not None:
+            self.add_error('image', error)
+
 
 class CommentForm(ModelForm):
     class Meta:
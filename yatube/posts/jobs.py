@@ -0,0 +1,50 @@
+"""Задачи постов, выполняемые воркером очереди (jobs)."""
+from django.core.mail import send_mail
+
+from jobs.queue import job
+
+from . import feeds
+from .models import Comment, Post
+
+COMMENT_SUBJECT = 'Новый комментарий к вашему посту'
+COMMENT_MESSAGE = '{author} прокомментировал ваш пост «{post:.30}»:\n\n{text}'
+
+
+@job()
+def fan_out(post_id):
+    """Раскладывает пост по лентам подписчиков вне запроса публикации."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author_id', 'pub_date'
+    ).first()
+    # Пост могли удалить, пока задача ждала в очереди.
+    if post is not None:
+        feeds.fan_out(post)
+
+
+@job()
+def restore_author(author_id):
+    """Доносит посты автора в ленты, когда его снова раскладывают."""
+    feeds.restore(author_id)
+
+
+@job()
+def notify_comment(comment_id):
+    """Письмо автору поста о новом комментарии."""
+    comment = Comment.objects.select_related(
+        'author', 'post__author'
+    ).filter(pk=comment_id).first()
+    if comment is None:
+        return
+    recipient = comment.post.author
+    if not recipient.email or recipient.pk == comment.author_id:
+        return
+    send_mail(
+        COMMENT_SUBJECT,
+        COMMENT_MESSAGE.format(
+            author=comment.author.get_full_name() or comment.author.username,
+            post=comment.post.text,
+            text=comment.text,
+        ),
+        None,
+        [recipient.email],
+    )
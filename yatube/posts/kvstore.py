@@ -0,0 +1,78 @@
+"""Хранилище ключей sorl-thumbnail с пакетным чтением.
+
+Это то же хранилище cached_db (кэш, а при промахе — таблица
+thumbnail_kvstore), но ключи всех миниатюр страницы можно прочитать
+заранее одним get_many из кэша и одним запросом к базе для промахов
+(prefetch); пока блок prefetch открыт, чтения этих ключей не обращаются
+ни к кэшу, ни к базе. Число обращений к кэшу и базе ведется в
+round_trips — его показывает команда thumbnail_lookups.
+"""
+import threading
+from contextlib import contextmanager
+
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+EMPTY_VALUE = cached_db_kvstore.EMPTY_VALUE
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    @property
+    def round_trips(self):
+        return getattr(self._local, 'round_trips', 0)
+
+    @round_trips.setter
+    def round_trips(self, value):
+        self._local.round_trips = value
+
+    @property
+    def _prefetched(self):
+        return getattr(self._local, 'prefetched', None) or {}
+
+    def _get_raw(self, key):
+        if key in self._prefetched:
+            value = self._prefetched[key]
+            return None if value == EMPTY_VALUE else value
+        value = self.cache.get(key)
+        self.round_trips += 1
+        if value is None:
+            try:
+                value = KVStoreModel.objects.get(key=key).value
+            except KVStoreModel.DoesNotExist:
+                value = EMPTY_VALUE
+            self.round_trips += 1
+            self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+        return None if value == EMPTY_VALUE else value
+
+    def get_many_raw(self, keys):
+        """Значения ключей: одно чтение кэша и один запрос к базе."""
+        values = self.cache.get_many(keys)
+        self.round_trips += 1
+        missing = [key for key in keys if key not in values]
+        if missing:
+            rows = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            self.round_trips += 1
+            found = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(found, settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(found)
+        return values
+
+    @contextmanager
+    def prefetch(self, image_files):
+        """Блок, в котором записи image_files уже прочитаны."""
+        previous = getattr(self._local, 'prefetched', None)
+        self._local.prefetched = {**(previous or {}), **self.get_many_raw(
+            [add_prefix(image_file.key) for image_file in image_files]
+        )}
+        try:
+            yield
+        finally:
+            self._local.prefetched = previous
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по уже существующим подпискам и постам'
+
+    def handle(self, *args, **options):
+        count = 0
+        for user_id, author_id in Follow.objects.order_by('pk').values_list(
+            'user_id', 'author_id'
+        ).iterator():
+            feeds.follow(user_id, author_id)
+            count += 1
+        self.stdout.write(f'Обработано подписок: {count}')
@@ -0,0 +1,130 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from posts import counters
+from posts.feeds import FeedPaginator
+from posts.models import Follow, Post, User, UserStats
+
+DISTRIBUTIONS = ('uniform', 'zipf', 'celebrity')
+# Распределения, где самые популярные авторы должны оказаться выше
+# промежуточного порога: иначе замер гибридной ленты ничего не мерит.
+SKEWED = ('zipf', 'celebrity')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает цену записи и чтения ленты подписок при разных '
+        'распределениях подписчиков и порогах FEED_PUSH_THRESHOLD. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='подписок на одного читателя')
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument('--reads', type=int, default=50)
+        parser.add_argument('--threshold', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stdout.write(
+            f'{"распределение":<12} {"порог":>8} '
+            f'{"запись, мс":>11} {"запросов":>9} '
+            f'{"чтение, мс":>11} {"запросов":>9} {"тянутся":>8}'
+        )
+        for distribution in DISTRIBUTIONS:
+            for threshold in (
+                options['users'], options['threshold'], 0
+            ):
+                write, read, pulled = self.run(distribution, threshold)
+                self.stdout.write(
+                    f'{distribution:<12} {threshold:>8} '
+                    f'{write[0]:>11.2f} {write[1]:>9.1f} '
+                    f'{read[0]:>11.2f} {read[1]:>9.1f} {pulled:>8}'
+                )
+
+    def run(self, distribution, threshold):
+        try:
+            with transaction.atomic(), override_settings(
+                FEED_PUSH_THRESHOLD=threshold
+            ):
+                self.populate(distribution)
+                pulled = UserStats.objects.filter(
+                    user__in=self.authors, followers_count__gt=threshold
+                ).count()
+                if (distribution in SKEWED and not pulled
+                        and threshold == self.options['threshold']):
+                    raise CommandError(
+                        f'Распределение {distribution}: ни один автор не '
+                        f'набрал больше {threshold} подписчиков.'
+                    )
+                write = self.measure(self.write, self.options['posts'])
+                read = self.measure(self.read, self.options['reads'])
+                raise Rollback
+        except Rollback:
+            pass
+        return write, read, pulled
+
+    def populate(self, distribution):
+        options = self.options
+        rnd = random.Random(options['seed'])
+        User.objects.bulk_create(
+            User(username=f'bench-feed-{i}')
+            for i in range(options['users'])
+        )
+        self.users = list(User.objects.filter(
+            username__startswith='bench-feed-'
+        ).order_by('pk'))
+        self.authors = self.users[:options['authors']]
+        weights = {
+            'uniform': [1] * len(self.authors),
+            'zipf': [1 / rank for rank in range(1, len(self.authors) + 1)],
+            'celebrity': [len(self.authors)] + [1] * (len(self.authors) - 1),
+        }[distribution]
+        follows = set()
+        for user in self.users:
+            for author in rnd.choices(
+                self.authors, weights, k=options['follows']
+            ):
+                if author != user:
+                    follows.add((user.pk, author.pk))
+        # bulk_create не шлет сигналов: ленты пусты до первых постов,
+        # а счетчики подписчиков, по которым авторы делятся на
+        # раскладываемых и читаемых, пересчитываются отдельно.
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in follows
+        )
+        counters.reconcile(user_ids=[user.pk for user in self.users])
+        self.rnd = rnd
+
+    def write(self):
+        Post.objects.create(
+            text='Тестовый пост', author=self.rnd.choice(self.authors)
+        )
+
+    def read(self):
+        """Первая и вторая страницы ленты случайного читателя."""
+        user = self.rnd.choice(self.users)
+        page = FeedPaginator(user, settings.MAX_POSTS).get_page(None)
+        FeedPaginator(user, settings.MAX_POSTS).get_page(page.next_cursor)
+
+    def measure(self, action, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                action()
+            elapsed = time.perf_counter() - start
+        return elapsed * 1000 / repeat, len(queries) / repeat
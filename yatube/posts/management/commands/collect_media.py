@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import media, thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, и '
+        'давно не читанные миниатюры сверх THUMBNAIL_CACHE_BUDGET. '
+        'Файлы и имена из базы обходятся потоком в порядке сортировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.MEDIA_GC_GRACE,
+            help='Сколько секунд не трогать новые и недавно читанные файлы'
+        )
+        parser.add_argument(
+            '--budget', type=int, default=settings.THUMBNAIL_CACHE_BUDGET,
+            help='Сколько байт может занимать каталог миниатюр'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что было бы удалено'
+        )
+
+    def handle(self, *args, **options):
+        dry_run, verbose = options['dry_run'], options['verbosity'] > 1
+        removed = 0
+        for name in media.orphans(options['grace'], options['batch_size']):
+            if dry_run or media.remove_orphan(name, options['grace']):
+                removed += 1
+                if verbose:
+                    self.stdout.write(f'Картинка: {name}')
+        evicted = freed = 0
+        stale = thumbnails.stale(options['budget'], options['grace'])
+        for name, size in stale:
+            if not dry_run:
+                thumbnails.evict(name)
+            evicted += 1
+            freed += size
+            if verbose:
+                self.stdout.write(f'Миниатюра: {name}')
+        if not dry_run:
+            # Карточки и страницы с удаленными миниатюрами собираются
+            # заново, иначе они ссылались бы на удаленные файлы.
+            for source in set(media.thumbnail_sources(
+                (name for name, _ in stale), options['batch_size']
+            ).values()):
+                thumbnails.refresh_cards(source)
+        self.stdout.write(
+            f'Удалено картинок без постов: {removed}, миниатюр: {evicted} '
+            f'({freed} байт)'
+        )
@@ -0,0 +1,31 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога posts/ под имена '
+        'по содержимому. Сайт при этом работает: посты переключаются на '
+        'копию файла по одному имени за транзакцию. Старые файлы остаются '
+        'на месте, пока на них ссылаются отданные страницы: их удалит '
+        'collect_media не раньше чем через MEDIA_GC_GRACE. Повторный '
+        'запуск продолжает с непереведенных имен.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        for name in media.legacy_names(options['batch_size']):
+            if not default_storage.exists(name):
+                self.stderr.write(f'Нет файла: {name}')
+                missing += 1
+                continue
+            new_name = media.readdress(name)
+            moved += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{name} -> {new_name}')
+        self.stdout.write(f'Перенесено файлов: {moved}, без файла: {missing}')
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from sorl.thumbnail import default
+
+from posts.cards import card_key, render_cards
+from posts.models import Post, User
+from posts.thumbnails import DeferredThumbnailBackend, sizes
+
+LOCAL_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'thumbnail-lookups',
+    }
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, сколько обращений к хранилищу ключей миниатюр '
+        'делает отрисовка страницы карточек без пакетного чтения и с ним, '
+        'при холодном и прогретом кэше. Данные создаются в транзакции '
+        'и откатываются, кэш используется временный.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"пакетно":<8} {"кэш":<10} {"обращений":>10} {"SQL":>5}'
+        )
+        try:
+            with transaction.atomic(), override_settings(CACHES=LOCAL_CACHE):
+                posts = self.populate(options['posts'])
+                for prefetch in (False, True):
+                    with override_settings(THUMBNAIL_PREFETCH=prefetch):
+                        for state in ('холодный', 'прогретый'):
+                            self.measure(posts, prefetch, state)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count):
+        author = User.objects.create(username='thumbnail-lookups')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=author,
+                 image=f'posts/thumbnail-lookups-{i}.jpg')
+            for i in range(count)
+        )
+        posts = list(author.posts.select_related('author', 'group'))
+        # Миниатюры считаются готовыми: записи есть в хранилище ключей.
+        backend = DeferredThumbnailBackend()
+        for post in posts:
+            for geometry, options in sizes():
+                thumbnail = backend.thumbnail_file(
+                    post.image, geometry, **options
+                )
+                thumbnail.set_size(
+                    [int(side) for side in geometry.split('x')]
+                )
+                default.kvstore.set(thumbnail)
+        return posts
+
+    def measure(self, posts, prefetch, state):
+        if state == 'холодный':
+            cache.clear()
+        else:
+            cache.delete_many([card_key(post) for post in posts])
+        default.kvstore.round_trips = 0
+        with CaptureQueriesContext(connection) as queries:
+            render_cards(posts)
+        self.stdout.write(
+            f'{"да" if prefetch else "нет":<8} {state:<10} '
+            f'{default.kvstore.round_trips:>10} {len(queries):>5}'
+        )
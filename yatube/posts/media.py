@@ -0,0 +1,201 @@
+"""Счетчики ссылок на файлы картинок постов.
+
+Хранилище (core.storage) дает одинаковым картинкам одно имя, поэтому
+файл нельзя удалять вместе с постом: на него могут ссылаться другие.
+Сколько постов ссылается на файл, хранит MediaFile; счетчики сдвигаются
+сигналами постов в той же транзакции. Файл, на который не осталось
+ссылок, удаляется после фиксации транзакции, если за это время на него
+никто снова не сослался и его не загружали заново последние
+MEDIA_UPLOAD_GRACE секунд: такая загрузка, возможно, еще не сохранила
+свой пост (см. ContentAddressedStorage.delete_idle).
+
+Картинки, загруженные до адресации по содержимому, переносит команда
+readdress_media (см. readdress). Файлы, на которые не ссылается ни
+один пост (старые имена, незавершенные загрузки), удаляет команда
+collect_media (см. orphans).
+"""
+from datetime import timedelta
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core.storage import is_addressed, walk
+
+from . import thumbnails
+from .models import MediaFile, Post
+
+
+def acquire(name):
+    # Считаются только имена по содержимому: старые имена принадлежат
+    # одному посту и переводятся командой readdress_media.
+    if not is_addressed(name):
+        return
+    MediaFile.objects.get_or_create(name=name)
+    MediaFile.objects.filter(name=name).update(refs=F('refs') + 1)
+
+
+def release(name):
+    if not is_addressed(name):
+        return
+    MediaFile.objects.filter(name=name, refs__gt=0).update(
+        refs=F('refs') - 1
+    )
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Удаляет файл и его миниатюры, если ссылок на файл нет."""
+    with transaction.atomic():
+        if Post.objects.filter(image=name).exists():
+            return False
+        deleted, _ = MediaFile.objects.filter(name=name, refs=0).delete()
+        if not deleted:
+            return False
+        # Недавно загруженный файл остается, пока его не подберет
+        # collect_media; строку счетчика acquire создаст заново.
+        if not default_storage.delete_idle(
+            name, settings.MEDIA_UPLOAD_GRACE
+        ):
+            return False
+    thumbnails.forget(name)
+    return True
+
+
+def changed(previous, current):
+    """Пост сменил картинку previous на current."""
+    if previous != current:
+        acquire(current)
+        release(previous)
+
+
+def referenced_names(batch_size=500):
+    """Различные имена картинок постов по возрастанию.
+
+    Читаются пачками по ключу, а не одним курсором: между пачками
+    таблица постов может меняться.
+    """
+    last = ''
+    while True:
+        names = list(Post.objects.filter(image__gt=last).order_by(
+            'image'
+        ).values_list('image', flat=True).distinct()[:batch_size])
+        if not names:
+            return
+        yield from names
+        last = names[-1]
+
+
+def legacy_names(batch_size=500):
+    """Имена картинок постов, еще не переведенные на адресацию."""
+    return (
+        name for name in referenced_names(batch_size)
+        if not is_addressed(name)
+    )
+
+
+def orphans(grace, batch_size=500):
+    """Файлы каталога upload_to без постов, не менявшиеся grace секунд.
+
+    Файлы хранилища и имена из базы идут в одном порядке и сливаются,
+    как при merge join: ни то, ни другое целиком в память не читается.
+    Файл моложе grace может принадлежать посту, который еще не
+    сохранен, — такие файлы пропускаются.
+    """
+    deadline = timezone.now() - timedelta(seconds=grace)
+    referenced = referenced_names(batch_size)
+    current = next(referenced, None)
+    directory = Post._meta.get_field('image').upload_to.rstrip('/')
+    for name in walk(default_storage, directory):
+        while current is not None and current < name:
+            current = next(referenced, None)
+        if name == current:
+            continue
+        if default_storage.get_modified_time(name) < deadline:
+            yield name
+
+
+def thumbnail_sources(names, batch_size=500):
+    """Картинки постов, к которым относятся миниатюры names.
+
+    Имя миниатюры — хеш картинки и опций, обратно оно не читается:
+    имена миниатюр текущих размеров считаются для каждой картинки
+    постов. Миниатюры прежних размеров карточки не показывают.
+    """
+    names, found = set(names), {}
+    if not names:
+        return found
+    for source in referenced_names(batch_size):
+        for name in thumbnails.thumbnail_names(source):
+            if name in names:
+                found[name] = source
+    return found
+
+
+def remove_orphan(name, grace):
+    """Удаляет файл без постов вместе с миниатюрами.
+
+    Ссылка проверяется еще раз: пост мог появиться после слияния, а
+    порядок строк базы может не совпасть с порядком имен в Python.
+    Время файла тоже: его могли загрузить заново.
+    """
+    with transaction.atomic():
+        if Post.objects.filter(image=name).exists():
+            return False
+        if not default_storage.delete_idle(name, grace):
+            return False
+        MediaFile.objects.filter(name=name).delete()
+    thumbnails.forget(name)
+    return True
+
+
+def readdress(name):
+    """Переносит файл name под имя по содержимому; возвращает новое имя.
+
+    Файл копируется, затем посты переключаются на копию одним UPDATE
+    (updated сдвигается, и карточки перерисовываются) и поднимают версии
+    своих страниц. Старый файл остается на месте: на него ссылаются уже
+    отданные страницы. Его время обновляется, и collect_media удалит
+    его не раньше, чем через свой срок ожидания; миниатюры старого имени
+    забываются после коммита.
+    """
+    with default_storage.open(name) as source:
+        new_name = default_storage.save(name, source)
+    with transaction.atomic():
+        moved = Post.objects.filter(image=name).update(
+            image=new_name, updated=timezone.now()
+        )
+        if moved:
+            MediaFile.objects.get_or_create(name=new_name)
+            MediaFile.objects.filter(name=new_name).update(
+                refs=F('refs') + moved
+            )
+            default_storage.touch(name)
+            thumbnails.refresh_pages(new_name)
+            # Повторно после коммита, как versions.bump_post.
+            transaction.on_commit(
+                lambda: thumbnails.refresh_pages(new_name)
+            )
+            transaction.on_commit(lambda: thumbnails.forget(name))
+            thumbnails.queue_on_commit(new_name)
+    return new_name
+
+
+def reconcile(apps=global_apps):
+    """Пересчитывает счетчики по постам; возвращает число файлов.
+
+    apps позволяет вызывать функцию из миграций с историческими моделями.
+    """
+    Post = apps.get_model('posts', 'Post')
+    MediaFile = apps.get_model('posts', 'MediaFile')
+    counts = Post.objects.exclude(image='').order_by().values(
+        'image'
+    ).annotate(refs=Count('pk'))
+    MediaFile.objects.all().delete()
+    return len(MediaFile.objects.bulk_create([
+        MediaFile(name=row['image'], refs=row['refs']) for row in counts
+        if is_addressed(row['image'])
+    ]))
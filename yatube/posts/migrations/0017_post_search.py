@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from posts.search import create_index, rebuild
+    create_index(schema_editor)
+    if schema_editor.connection.vendor == 'sqlite':
+        rebuild(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from posts.search import TABLE
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -61,11 +61,27 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Версия карточки поста в кэше'
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы под постраничный вывод по ключу (pub_date, id).
+        indexes = (
+            models.Index(fields=('pub_date', 'id')),
+            models.Index(fields=('group', 'pub_date', 'id')),
+            models.Index(fields=('author', 'pub_date', 'id')),
+        )
 
     def __str__(self):
         return STRING_FROM_POST.format(
@@ -105,9 +121,12 @@ class Comment(models.Model):
     )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(fields=('post', 'pub_date', 'id')),
+        )
 
     def __str__(self) -> str:
         return STRING_FROM_COMMENT.format(
@@ -151,3 +170,92 @@ class Follow(models.Model):
             self.author.username,
             self.author.id,
         )
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: запись на каждый пост автора,
+    на которого подписан пользователь. Заполняется при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    # Записи удаляются пачками из сигналов, а не каскадом:
+    # каскад загрузил бы в память всю ленту разом.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique timeline entry'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', 'pub_date', 'post')),
+            models.Index(fields=('user', 'author')),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} <== {self.post_id}'
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, поддерживаемые при записи.
+
+    Обновляются в той же транзакции, что и посты, комментарии и подписки;
+    расхождения чинит команда reconcile_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count} постов'
+
+
+class MediaFile(models.Model):
+    """Сколько постов ссылается на файл картинки.
+
+    Одинаковые загрузки хранятся одним файлом (core.storage), и файл
+    удаляется, только когда на него не осталось ссылок.
+    """
+    name = models.CharField('Файл', max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return f'{self.name}: {self.refs}'
@@ -0,0 +1,119 @@
+"""Кэш целых страниц для гостей.
+
+Страница, отмеченная cache_for_guests, для запроса без cookie сессии
+отдается из кэша целиком, до сессий, аутентификации и CSRF. Ключ
+включает путь, параметры PAGE_PARAMS и ETag областей страницы
+(posts.versions), поэтому сброс не нужен: запись поста поднимает
+версии самого поста, его группы, профиля автора и ленты, и ровно эти
+страницы начинают собираться заново — из представлений, админки и
+команд одинаково.
+Старые записи вытесняются по GUEST_PAGE_TIMEOUT. Запросы с другими
+параметрами собираются без кэша: иначе каждый новый ?utm=… заводил бы
+свою запись.
+
+Ответы гостям разрешают общим кэшам хранить их GUEST_PAGE_MAX_AGE
+секунд (Vary: Cookie отделяет их от страниц пользователей), ответы
+пользователям помечаются private.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import parse_http_date_safe
+
+from . import versions
+
+# С этими cookie ответ зависит от посетителя.
+PERSONAL_COOKIES = (settings.SESSION_COOKIE_NAME, 'messages')
+# Параметры запроса, которые читают отмеченные страницы.
+PAGE_PARAMS = {'cursor', 'page'}
+
+
+def cache_for_guests(scopes):
+    """Отмечает страницу для кэша гостей; scopes — как у conditional."""
+    def decorator(view):
+        view.guest_page_scopes = scopes
+        return view
+    return decorator
+
+
+def page_key(request, scopes):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    path = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'guest_page:{versions.stamp(scopes)[0]}:{path}'
+
+
+def forget_stale(request, response):
+    """Снимает ETag и Last-Modified со страницы с фрагментом прежней версии.
+
+    Валидаторы посчитаны по текущим версиям, и с ними клиент получал бы
+    304 на устаревшую страницу до следующей записи.
+    """
+    if getattr(request, 'served_stale', False):
+        del response['ETag']
+        del response['Last-Modified']
+    return response
+
+
+class GuestPageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = self.cached_view(request)
+        if match is None:
+            return self.get_response(request)
+        if any(name in request.COOKIES for name in PERSONAL_COOKIES):
+            response = forget_stale(request, self.get_response(request))
+            patch_cache_control(response, private=True)
+            return response
+        if not PAGE_PARAMS.issuperset(request.GET):
+            return forget_stale(request, self.get_response(request))
+        # Сессии еще нет, но без ее cookie посетитель — гость.
+        request.user = AnonymousUser()
+        scopes = match.func.guest_page_scopes(
+            request, *match.args, **match.kwargs
+        )
+        if scopes is None:
+            return self.get_response(request)
+        key = page_key(request, scopes)
+        response = cache.get(key)
+        if response is not None:
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')
+                ),
+                response=response,
+            )
+        response = forget_stale(request, self.get_response(request))
+        if response.status_code != 200 or response.streaming:
+            return response
+        patch_cache_control(
+            response, public=True, max_age=settings.GUEST_PAGE_MAX_AGE
+        )
+        patch_vary_headers(response, ['Cookie'])
+        if request.method == 'GET' and not response.cookies and not getattr(
+            request, 'served_stale', False
+        ):
+            cache.set(key, response, settings.GUEST_PAGE_TIMEOUT)
+        return response
+
+    def cached_view(self, request):
+        """Маршрут страницы, если она отмечена cache_for_guests."""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if not hasattr(match.func, 'guest_page_scopes'):
+            return None
+        return match
@@ -0,0 +1,194 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from core.cache import guarded
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, values):
+    return urlsafe_base64_encode(json.dumps(
+        [direction] + [str(value) for value in values]
+    ).encode())
+
+
+def decode_cursor(token):
+    try:
+        direction, *values = json.loads(urlsafe_base64_decode(token))
+    except (TypeError, ValueError):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def seek(keys, values, lookup):
+    """Условие «кортеж keys строго меньше/больше values»."""
+    condition = Q()
+    for index, key in enumerate(keys):
+        condition |= Q(
+            **dict(zip(keys[:index], values[:index])),
+            **{f'{key}__{lookup}': values[index]}
+        )
+    return condition
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с приблизительным числом записей.
+
+    Число берется готовым (count, например из счетчиков) или из кэша по
+    count_key на PAGINATOR_COUNT_TIMEOUT секунд, так что COUNT(*)
+    выполняется не чаще раза за это время и одним запросом из всех
+    одновременных (core.cache.guarded).
+    """
+
+    def __init__(self, object_list, per_page,
+                 count=None, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return self.object_list.count()
+        return guarded.fetch(
+            f'paginator_count:{self.count_key}',
+            self.object_list.count,
+            settings.PAGINATOR_COUNT_TIMEOUT
+        )
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, pk) вместо OFFSET.
+
+    Страница выбирается условием на ключ последней показанной записи,
+    поэтому стоимость запроса не зависит от глубины страницы и не
+    требует COUNT(*). Ключи упорядочены по убыванию.
+    """
+
+    def __init__(self, object_list, per_page,
+                 keys=('pub_date', 'pk'), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.keys = keys
+
+    def _to_python(self, values):
+        if len(values) != len(self.keys):
+            raise InvalidCursor(values)
+        meta = self.object_list.model._meta
+        try:
+            return [
+                (meta.pk if key == 'pk' else meta.get_field(key)).to_python(
+                    value
+                )
+                for key, value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise InvalidCursor(values)
+
+    def fetch(self, queryset, keys, direction, values):
+        """Первые per_page + 1 записей после ключа values в сторону direction.
+
+        Для PREVIOUS записи идут по возрастанию ключа, иначе — по убыванию.
+        """
+        if direction == PREVIOUS:
+            queryset = queryset.filter(seek(keys, values, 'gt')).order_by(
+                *keys
+            )
+        else:
+            if values is not None:
+                queryset = queryset.filter(seek(keys, values, 'lt'))
+            queryset = queryset.order_by(*(f'-{key}' for key in keys))
+        return list(queryset[:self.per_page + 1])
+
+    def items(self, direction, values):
+        return self.fetch(self.object_list, self.keys, direction, values)
+
+    def key(self, item):
+        return [getattr(item, key) for key in self.keys]
+
+    def _position(self, cursor):
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor)
+                return direction, self._to_python(values)
+            except InvalidCursor:
+                pass
+        return NEXT, None
+
+    def get_page(self, cursor):
+        """Страница по непрозрачному токену; неверный токен — первая."""
+        items, next_cursor, previous_cursor = self.resolve(
+            *self._position(cursor)
+        )
+        page = Page(items, 1, self)
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
+
+    def get_lazy_page(self, cursor):
+        """Как get_page, но записи читаются при первом обращении."""
+        return CursorPage(self, *self._position(cursor))
+
+    def resolve(self, direction, values):
+        """Записи страницы и курсоры соседних: (записи, next, previous)."""
+        items = self.items(direction, values)
+        has_more = len(items) > self.per_page
+        if direction == PREVIOUS and not has_more:
+            # Дошли до начала ленты: показываем полную первую страницу.
+            return self.resolve(NEXT, None)
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+            has_newer, has_older = has_more, True
+        else:
+            has_newer, has_older = values is not None, has_more
+        return (
+            items,
+            encode_cursor(NEXT, self.key(items[-1]))
+            if has_older and items else None,
+            encode_cursor(PREVIOUS, self.key(items[0]))
+            if has_newer and items else None,
+        )
+
+
+class CursorPage(Page):
+    """Страница по курсору; записи читаются при первом обращении.
+
+    Фрагмент шаблона из кэша к странице не обращается, и запроса к базе
+    за ее записями тогда нет вовсе.
+    """
+
+    def __init__(self, paginator, direction, values):
+        self.number = 1
+        self.paginator = paginator
+        self.direction = direction
+        self.values = values
+
+    @cached_property
+    def _resolved(self):
+        return self.paginator.resolve(self.direction, self.values)
+
+    @property
+    def object_list(self):
+        return self._resolved[0]
+
+    @property
+    def next_cursor(self):
+        return self._resolved[1]
+
+    @property
+    def previous_cursor(self):
+        return self._resolved[2]
@@ -0,0 +1,175 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Тексты постов лежат в виртуальной таблице posts_post_search с rowid,
+равным id поста; сигналы сохранения и удаления поста держат ее в
+актуальном состоянии, а rebuild_search_index заполняет заново (например,
+после bulk_create). Токенизатор unicode61 приводит кириллицу к нижнему
+регистру; стемминга для русского в SQLite нет, поэтому у слов запроса
+отрезаются типичные окончания и ищется префикс: «котами» найдет «кот»,
+«кота» и «котов». Буква «ё» и в тексте, и в запросе заменяется на «е».
+
+Результаты упорядочены по bm25 и листаются курсором по (score, id),
+где score = -bm25: чем больше, тем релевантнее.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import PREVIOUS, CursorPaginator, InvalidCursor
+
+TABLE = 'posts_post_search'
+TOKENIZER = 'unicode61 remove_diacritics 2'
+# Окончания от длинных к коротким: отрезается первое подходящее.
+ENDINGS = sorted((
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях', 'ах',
+    'ях', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой', 'ей', 'ый', 'ий',
+    'ом', 'ем', 'ов', 'ев', 'ам', 'ям', 'ию', 'ия', 'ь', 'а', 'я', 'о',
+    'е', 'ы', 'и', 'у', 'ю',
+), key=len, reverse=True)
+MIN_STEM = 3
+MAX_TERMS = 10
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 24
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def fold(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def create_index(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+        f'USING fts5(text, tokenize=\'{TOKENIZER}\')'
+    )
+
+
+def rebuild(using=connection):
+    """Заполняет индекс заново по всем постам; возвращает их число."""
+    with using.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'SELECT id, text FROM {Post._meta.db_table}')
+        rows = [(pk, fold(text)) for pk, text in cursor.fetchall()]
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)', rows
+        )
+    return len(rows)
+
+
+def index_post(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, fold(post.text)]
+        )
+
+
+def remove_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def match_expression(query):
+    """Выражение MATCH: все слова запроса как префиксы основ."""
+    words = re.findall(r'\w+', fold(query).lower())[:MAX_TERMS]
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+def matching_ids(expression):
+    """Подзапрос id постов, подходящих под выражение MATCH."""
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [expression]
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Страницы результатов поиска по курсору (score, pk).
+
+    object_list — выражение MATCH; записи страницы — посты с
+    атрибутами score и snippet (HTML с подсвеченными словами).
+    """
+
+    def __init__(self, expression, per_page, **kwargs):
+        super().__init__(
+            expression, per_page, keys=('score', 'pk'), **kwargs
+        )
+
+    def _to_python(self, values):
+        try:
+            score, pk = values
+            return [float(score), int(pk)]
+        except (TypeError, ValueError):
+            raise InvalidCursor(values)
+
+    def items(self, direction, values):
+        if not self.object_list or not available():
+            return []
+        ranked = (
+            f'SELECT rowid AS id, -bm25({TABLE}) AS score '
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s'
+        )
+        params = [self.object_list]
+        if direction == PREVIOUS:
+            where, order = '(score, id) > (%s, %s)', 'score, id'
+        else:
+            where, order = '(score, id) < (%s, %s)', 'score DESC, id DESC'
+        if values is not None:
+            ranked = f'SELECT * FROM ({ranked}) WHERE {where}'
+            params += values
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, score FROM ({ranked}) ORDER BY {order} LIMIT %s',
+                params + [self.per_page + 1]
+            )
+            scores = dict(cursor.fetchall())
+            if not scores:
+                return []
+            # Фрагменты считаются только для найденной страницы.
+            cursor.execute(
+                f'SELECT rowid, snippet({TABLE}, 0, %s, %s, %s, %s) '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'AND rowid IN ({", ".join(["%s"] * len(scores))})',
+                [MARK_START, MARK_END, '…', SNIPPET_TOKENS,
+                 self.object_list, *scores]
+            )
+            snippets = dict(cursor.fetchall())
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            list(scores)
+        )
+        items = []
+        for pk, score in scores.items():
+            if pk in posts:
+                post = posts[pk]
+                post.score = score
+                post.snippet = highlight(snippets.get(pk, ''))
+                items.append(post)
+        return items
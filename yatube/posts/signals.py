@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    autocomplete, counters, feeds, jobs, media, search, thumbnails, versions
+)
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    autocomplete.USERS.changed(instance, update_fields)
+    # Вход в систему меняет только last_login: профиль тот же.
+    if set(update_fields or ()) != {'last_login'}:
+        versions.bump('profile', instance.pk)
+        # Имя автора видно в постах: переименование меняет их все.
+        if not created:
+            versions.bump('users')
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.USERS.removed(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        autocomplete.GROUPS.changed(instance, update_fields)
+        versions.bump('groups')
+        versions.bump('group', instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    autocomplete.GROUPS.removed(instance)
+    versions.bump('groups')
+    versions.bump('group', instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    # Пост мог сменить группу: старую ленту группы тоже надо обновить;
+    # для новой картинки нужны миниатюры.
+    instance.previous_group_id, instance.previous_image = None, None
+    if instance.pk and not raw:
+        instance.previous_group_id, instance.previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump(instance.author_id, posts_count=1)
+        # Раскладка по тысячам лент не должна задерживать публикацию.
+        if feeds.followers_count(
+            instance.author_id
+        ) > settings.FEED_INLINE_FAN_OUT:
+            jobs.fan_out.delay(instance.pk)
+        else:
+            feeds.fan_out(instance)
+    search.index_post(instance)
+    media.changed(instance.previous_image, instance.image.name)
+    if instance.image and instance.image.name != instance.previous_image:
+        thumbnails.queue_on_commit(instance.image.name)
+    versions.bump_post(instance, instance.previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, posts_count=-1)
+    feeds.remove_post(instance)
+    search.remove_post(instance.pk)
+    media.release(instance.image.name)
+    versions.bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump(instance.author_id, comments_count=1)
+        counters.bump_comments(instance.post_id, 1)
+        jobs.notify_comment.delay(instance.pk)
+        bump_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump(instance.author_id, comments_count=-1)
+    counters.bump_comments(instance.post_id, -1)
+    bump_comment(instance)
+
+
+def bump_comment(comment):
+    # Число комментариев видно у поста и в профиле автора комментария;
+    # в списках постов API оно тоже есть — для них общая область comments.
+    versions.bump('post', comment.post_id)
+    versions.bump('profile', comment.author_id)
+    versions.bump('comments')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump(instance.user_id, following_count=1)
+        counters.bump(instance.author_id, followers_count=1)
+        feeds.follow(instance.user_id, instance.author_id)
+        bump_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump(instance.user_id, following_count=-1)
+    counters.bump(instance.author_id, followers_count=-1)
+    feeds.unfollow(instance.user_id, instance.author_id)
+    # Автор опустился до порога: его посты снова раскладываются.
+    if feeds.followers_count(
+        instance.author_id
+    ) == settings.FEED_PUSH_THRESHOLD:
+        jobs.restore_author.delay(instance.author_id)
+    bump_follow(instance)
+
+
+def bump_follow(follow):
+    # Счетчики подписок видны в обоих профилях, лента — у подписчика.
+    versions.bump('profile', follow.user_id)
+    versions.bump('profile', follow.author_id)
+    versions.bump('feed', follow.user_id)
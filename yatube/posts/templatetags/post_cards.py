@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, hide_author=False, hide_group=False):
+    """Отрисованные карточки постов страницы, по возможности из кэша."""
+    return [
+        mark_safe(card)
+        for card in render_cards(posts, hide_author, hide_group)
+    ]
@@ -0,0 +1,28 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+# Картинка занимает всю ширину колонки контента, не шире 960px.
+SIZES_ATTRIBUTE = '(min-width: 992px) 960px, 100vw'
+DEFAULT_WIDTH = 960
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """<picture> с вариантами картинки поста или исходная картинка."""
+    found = thumbnails.variants(post.image) if post.image else None
+    if not found:
+        return {'post': post}
+    jpeg = found['JPEG']
+    src = min(jpeg, key=lambda variant: abs(variant[1] - DEFAULT_WIDTH))
+    return {
+        'post': post,
+        'webp': found.get('WEBP'),
+        'jpeg': jpeg,
+        'src': src[0],
+        'width': src[1],
+        'height': round(src[1] * thumbnails.RATIO),
+        'sizes': SIZES_ATTRIBUTE,
+    }
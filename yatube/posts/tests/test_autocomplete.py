@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import versions
+from ..autocomplete import GROUPS, INDEXES, USERS
+from ..forms import PostForm
+from ..models import Group, Post, User
+
+GROUPS_URL = reverse('posts:autocomplete', args=['groups'])
+USERS_URL = reverse('posts:autocomplete', args=['users'])
+UNKNOWN_URL = reverse('posts:autocomplete', args=['posts'])
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {slug}', slug=slug, description='Описание'
+            )
+            for slug in ('cats', 'Catering', 'dogs', 'cat')
+        ]
+        cls.user = User.objects.create_user(
+            username='Mouse', first_name='Микки', last_name='Маус'
+        )
+
+    def setUp(self):
+        # Индексы живут в памяти процесса, а база между тестами
+        # откатывается: каждый тест начинает с пустых индексов.
+        cache.clear()
+        for index in INDEXES.values():
+            index.entries = None
+        self.client = Client()
+
+    def slugs(self, prefix, **kwargs):
+        return [item['value'] for item in GROUPS.search(prefix, **kwargs)]
+
+    def test_prefix_search(self):
+        """Подсказки идут по алфавиту без учета регистра."""
+        self.assertEqual(self.slugs('CAT'), ['cat', 'Catering', 'cats'])
+        self.assertEqual(self.slugs('cat', limit=2), ['cat', 'Catering'])
+        self.assertEqual(self.slugs('dog'), ['dogs'])
+        self.assertEqual(self.slugs('x'), [])
+        self.assertEqual(USERS.search('mo'), [{
+            'id': self.user.pk, 'value': 'Mouse', 'label': 'Микки Маус'
+        }])
+
+    def test_incremental_updates(self):
+        """Изменения групп попадают в индекс без его перестроения."""
+        self.slugs('')
+        group = Group.objects.create(
+            title='Котики', slug='catnip', description='Описание'
+        )
+        group.slug = 'kittens'
+        group.save()
+        self.groups[0].delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs('cat'), ['cat', 'Catering'])
+            self.assertEqual(self.slugs('kit'), ['kittens'])
+
+    def test_foreign_changes_are_replayed(self):
+        """Изменения других процессов применяются по журналу без базы."""
+        self.slugs('')
+        # Индекс процесса, который не видел этих изменений.
+        stale = (list(GROUPS.entries), dict(GROUPS.by_pk), GROUPS.version)
+        Group.objects.create(
+            title='Котики', slug='catnip', description='Описание'
+        )
+        Group.objects.get(slug='cats').delete()
+        GROUPS.entries, GROUPS.by_pk, GROUPS.version = stale
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs('cat'), ['cat', 'Catering', 'catnip'])
+
+    def test_reload_after_foreign_change(self):
+        """Изменение без записи в журнале перестраивает индекс."""
+        self.slugs('')
+        Group.objects.filter(slug='dogs').update(slug='puppies')
+        versions.bump('autocomplete', 'groups')
+        self.assertEqual(self.slugs('pup'), ['puppies'])
+
+    def test_autocomplete_view(self):
+        """Подсказки отдаются в JSON, неизвестный индекс — 404."""
+        response = self.client.get(GROUPS_URL, {'q': 'do'})
+        self.assertEqual(response.json()['results'], [{
+            'id': self.groups[2].pk, 'value': 'dogs', 'label': 'Группа dogs'
+        }])
+        self.assertEqual(
+            self.client.get(USERS_URL, {'q': 'm'}).json()['results'][0]['id'],
+            self.user.pk
+        )
+        self.assertEqual(self.client.get(UNKNOWN_URL).status_code, 404)
+
+    def test_form_renders_only_selected_group(self):
+        """Форма поста не загружает все группы в список."""
+        post = Post.objects.create(
+            text='Текст', author=self.user, group=self.groups[2]
+        )
+        with self.assertNumQueries(1):
+            html = str(PostForm(instance=post)['group'])
+        self.assertIn(f'<option value="{self.groups[2].pk}" selected>', html)
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn(f'data-autocomplete="{GROUPS_URL}"', html)
+        self.assertEqual(str(PostForm()['group']).count('<option'), 1)
@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+AUTHOR = 'author'
+READER = 'reader'
+PASSWORD = 'password'
+SLUG = 'test_slug'
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR])
+
+
+class ConditionalGetTests(TestCase):
+    """Страницы поста, группы и профиля отвечают 304 по ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.reader = User.objects.create_user(
+            username=READER, password=PASSWORD
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug=SLUG, description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.POST_URL = reverse('posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def etag(self, url, client=None):
+        response = (client or self.guest).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_skips_view(self):
+        """Совпавший ETag дает 304 для GET и HEAD без запросов к базе."""
+        for url in (self.POST_URL, GROUP_URL, PROFILE_URL):
+            etag = self.etag(url)
+            for method in (self.guest.get, self.guest.head):
+                with self.subTest(url=url, method=method.__name__):
+                    with CaptureQueriesContext(connection) as queries:
+                        response = method(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b'')
+                    self.assertEqual(len(queries), 0)
+
+    def test_changes_replace_etag(self):
+        """Комментарий, правка поста и подписка меняют ETag страниц."""
+        changes = [
+            (self.POST_URL, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )),
+            (GROUP_URL, lambda: self.post.save()),
+            (PROFILE_URL, lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )),
+            (PROFILE_URL, lambda: Comment.objects.create(
+                post=self.post, author=self.author, text='Ответ'
+            )),
+        ]
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                change()
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_viewer_has_own_etag(self):
+        """Гость и пользователь не получают страницы друг друга."""
+        for url in (self.POST_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['user'].is_authenticated)
+
+    def test_new_login_replaces_etag(self):
+        """После повторного входа форма с прежним CSRF-токеном не вернется."""
+        client = Client()
+        credentials = {'username': READER, 'password': PASSWORD}
+        client.post(reverse('users:login'), credentials)
+        etag = self.etag(self.POST_URL, client)
+        self.assertEqual(client.get(
+            self.POST_URL, HTTP_IF_NONE_MATCH=etag
+        ).status_code, 304)
+        client.post(reverse('users:logout'))
+        client.post(reverse('users:login'), credentials)
+        response = client.get(self.POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_missing_page_has_no_validators(self):
+        """Несуществующие страницы отдают 404 без ETag."""
+        for url in (
+            reverse('posts:post_detail', args=[self.post.pk + 1]),
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+AUTHOR = 'author'
+READER = 'reader'
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR])
+FOLLOW_URL = reverse('posts:profile_follow', args=[AUTHOR])
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[AUTHOR])
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.reader = User.objects.create_user(username=READER)
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.POST_URL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.COMMENT_URL = reverse('posts:add_comment', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются вместе с постами, комментариями, подписками."""
+        self.reader_client.post(self.COMMENT_URL, {'text': 'Комментарий'})
+        self.reader_client.get(FOLLOW_URL)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.reader_client.get(UNFOLLOW_URL)
+        Comment.objects.all().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+        Post.objects.all().delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_pages_render_without_aggregates(self):
+        """Профиль и пост не выполняют COUNT для счетчиков."""
+        for url in (PROFILE_URL, self.POST_URL):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse([
+                    query for query in queries
+                    if 'COUNT(' in query['sql'].upper()
+                ])
+
+    def test_reconcile_repairs_drift(self):
+        """reconcile_counters пересчитывает испорченные счетчики."""
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.author)
+        ])
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
@@ -0,0 +1,160 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+
+from ..models import Follow, Post, Timeline, User
+
+FOLLOWER = 'follower'
+AUTHOR = 'author'
+FOLLOW_URL = reverse('posts:follow_index')
+CREATE_URL = reverse('posts:post_create')
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[AUTHOR])
+
+
+@override_settings(TIMELINE_BATCH_SIZE=2)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+            for i in range(5)
+        ]
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def feed(self):
+        return list(self.follower_client.get(FOLLOW_URL).context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка переносит в ленту уже опубликованные посты."""
+        self.assertEqual(self.feed(), self.posts[::-1])
+
+    def test_post_create_fans_out(self):
+        """Новый пост сразу попадает в ленту подписчика."""
+        self.author_client.post(CREATE_URL, {'text': 'Новый пост'})
+        post = Post.objects.get(text='Новый пост')
+        self.assertTrue(Timeline.objects.filter(
+            user=self.follower, post=post
+        ).exists())
+        self.assertEqual(self.feed()[0], post)
+
+    @override_settings(FEED_INLINE_FAN_OUT=0)
+    def test_large_fan_out_is_queued(self):
+        """Большую раскладку делает воркер очереди, а не запрос."""
+        self.author_client.post(CREATE_URL, {'text': 'Новый пост'})
+        post = Post.objects.get(text='Новый пост')
+        self.assertNotIn(post, self.feed())
+        self.assertEqual(queue.work(), (1, 1))
+        self.assertEqual(self.feed()[0], post)
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        self.follower_client.get(UNFOLLOW_URL)
+        self.assertFalse(Timeline.objects.filter(user=self.follower).exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_post_delete_clears_timeline(self):
+        """Удаленный пост пропадает из лент."""
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+        self.assertNotIn(self.posts[0], self.feed())
+        self.assertFalse(
+            Timeline.objects.filter(post_id=self.posts[0].pk).exists()
+        )
+
+    def test_backfill_command(self):
+        """Команда восстанавливает ленты по существующим подпискам."""
+        Timeline.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertEqual(self.feed(), self.posts[::-1])
+
+
+@override_settings(FEED_PUSH_THRESHOLD=1, MAX_POSTS=3)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.regular = User.objects.create_user(username='regular')
+        cls.popular = User.objects.create_user(username='popular')
+        Follow.objects.create(user=cls.reader, author=cls.regular)
+        Follow.objects.create(user=cls.reader, author=cls.popular)
+        Follow.objects.create(user=cls.other, author=cls.popular)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.popular if i % 2 else cls.regular
+            )
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_popular_author_is_pulled(self):
+        """Посты популярного автора не раскладываются по лентам."""
+        self.assertFalse(
+            Timeline.objects.filter(author=self.popular).exists()
+        )
+        self.assertEqual(
+            Timeline.objects.filter(author=self.regular).count(), 4
+        )
+
+    def test_feed_merges_pushed_and_pulled(self):
+        """Лента сливает оба потока по дате и листается курсором."""
+        feed, cursor = [], None
+        while True:
+            page = self.client.get(
+                FOLLOW_URL, {'cursor': cursor} if cursor else {}
+            ).context['page_obj']
+            feed.extend(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(feed, self.posts[::-1])
+
+    def test_legacy_page_links(self):
+        """Старые ссылки ?page= видят те же посты."""
+        page = self.client.get(FOLLOW_URL, {'page': 3}).context['page_obj']
+        self.assertEqual(list(page), [self.posts[0]])
+
+    def test_author_below_threshold_is_restored(self):
+        """Автор, опустившийся до порога, возвращается в ленты целиком."""
+        Follow.objects.filter(user=self.other, author=self.popular).delete()
+        queue.work()
+        self.assertEqual(
+            Timeline.objects.filter(author=self.popular).count(), 3
+        )
+        self.assertEqual(
+            list(self.client.get(FOLLOW_URL).context['page_obj']),
+            self.posts[:-4:-1]
+        )
+
+
+class BenchFeedTests(TestCase):
+    OPTIONS = {
+        'users': 40, 'authors': 5, 'follows': 3, 'posts': 2, 'reads': 2,
+    }
+
+    def test_skewed_authors_are_pulled(self):
+        """В замере популярные авторы выходят за порог и читаются."""
+        output = StringIO()
+        call_command('bench_feed', threshold=10, stdout=output,
+                     **self.OPTIONS)
+        rows = [line.split() for line in output.getvalue().splitlines()[1:]]
+        pulled = {(row[0], int(row[1])): int(row[-1]) for row in rows}
+        self.assertGreater(pulled['celebrity', 10], 0)
+        self.assertEqual(pulled['celebrity', 40], 0)
+        with self.assertRaises(CommandError):
+            call_command('bench_feed', threshold=39, stdout=StringIO(),
+                         **self.OPTIONS)
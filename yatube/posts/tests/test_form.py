@@ -6,6 +6,8 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from core.storage import is_addressed
+
 from ..models import Comment, Group, Post, User
 
 # Создаем временную папку для медиа-файлов;
@@ -126,10 +128,11 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.author, self.user_2)
         self.assertRedirects(response, PROFILE_URL_2)
-        self.assertEqual(
-            post.image,
-            f'{Post.image.field.upload_to}{form_data["image"].name}'
+        # Имя файла — хеш содержимого в каталоге upload_to.
+        self.assertTrue(
+            post.image.name.startswith(Post.image.field.upload_to)
         )
+        self.assertTrue(is_addressed(post.image.name))
 
     def test_post_edit_by_author(self):
         """Выполнение редактирование поста автором"""
@@ -150,10 +153,11 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.author, self.post.author)
-        self.assertEqual(
-            post.image,
-            f'{Post.image.field.upload_to}{form_data["image"].name}'
+        # Имя файла — хеш содержимого в каталоге upload_to.
+        self.assertTrue(
+            post.image.name.startswith(Post.image.field.upload_to)
         )
+        self.assertTrue(is_addressed(post.image.name))
 
     def test_authorized_comment_create(self):
         """"Проверка создания комментария"""
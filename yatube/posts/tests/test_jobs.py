@@ -0,0 +1,44 @@
+from django.core import mail
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+
+from ..jobs import COMMENT_SUBJECT
+from ..models import Post, User
+
+
+class CommentNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def comment(self, user):
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'}
+        )
+
+    def test_comment_notification_is_sent_by_worker(self):
+        """Письмо автору уходит из воркера, а не из запроса."""
+        self.comment(self.reader)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(queue.work(), (1, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, COMMENT_SUBJECT)
+        self.assertEqual(mail.outbox[0].to, [self.author.email])
+        self.assertIn('Комментарий', mail.outbox[0].body)
+
+    def test_own_comment_is_not_notified(self):
+        """Автор не получает письма о своих комментариях."""
+        self.comment(self.author)
+        self.assertEqual(queue.work(), (1, 1))
+        self.assertEqual(mail.outbox, [])
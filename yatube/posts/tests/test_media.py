@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.storage import is_addressed
+
+from sorl.thumbnail import default
+
+from .. import media, thumbnails, versions
+from ..models import Group, MediaFile, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def refs(name):
+    return MediaFile.objects.filter(name=name).values_list(
+        'refs', flat=True
+    ).first()
+
+
+@mock.patch.object(thumbnails, 'queue_on_commit', mock.Mock())
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_UPLOAD_GRACE=0)
+class MediaReferenceTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+
+    def create_post(self, name):
+        return Post.objects.create(
+            text='Пост', author=self.author,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+        )
+
+    def test_file_lives_while_posts_reference_it(self):
+        """Общий файл удаляется вместе с последней ссылкой на него."""
+        first, second = self.create_post('a.gif'), self.create_post('b.gif')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(refs(name), 2)
+        first.delete()
+        self.assertEqual(refs(name), 1)
+        self.assertTrue(default_storage.exists(name))
+        second.image = SimpleUploadedFile('c.gif', b'GIF89a', 'image/gif')
+        second.save()
+        self.assertIsNone(refs(name))
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(refs(second.image.name), 1)
+
+    @override_settings(MEDIA_UPLOAD_GRACE=60)
+    def test_reuploaded_file_survives_last_release(self):
+        """Файл, загруженный заново, не удаляется до сохранения поста."""
+        post = self.create_post('a.gif')
+        name = post.image.name
+        used = time.time() - 3600
+        os.utime(default_storage.path(name), (used, used))
+        # Та же картинка загружена для нового поста, пост еще не сохранен.
+        default_storage.save('posts/b.gif', ContentFile(SMALL_GIF))
+        post.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertIsNone(refs(name))
+        self.assertEqual(self.create_post('b.gif').image.name, name)
+        self.assertEqual(refs(name), 1)
+
+
+@mock.patch.object(thumbnails, 'queue_on_commit', mock.Mock())
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReaddressMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_legacy_files_are_moved_without_removing_old(self):
+        """Посты переходят на файл по содержимому, старый файл остается."""
+        author = User.objects.create_user(username='author')
+        legacy = FileSystemStorage(location=TEMP_MEDIA_ROOT)
+        names = [
+            legacy.save(f'posts/legacy-{i}.gif', ContentFile(SMALL_GIF))
+            for i in range(2)
+        ]
+        posts = [
+            Post.objects.create(text='Пост', author=author, image=name)
+            for name in names + names[:1]
+        ]
+        call_command('readdress_media', batch_size=1, stdout=mock.Mock())
+        new_names = {post.image.name for post in Post.objects.all()}
+        self.assertEqual(len(new_names), 1)
+        new_name = new_names.pop()
+        self.assertTrue(is_addressed(new_name))
+        self.assertEqual(refs(new_name), len(posts))
+        for name in names:
+            self.assertTrue(default_storage.exists(name))
+
+    def test_readdressed_pages_are_refreshed(self):
+        """Версии страниц поднимаются, старый файл ждет срок сборщика."""
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        legacy = FileSystemStorage(location=TEMP_MEDIA_ROOT)
+        name = legacy.save('posts/legacy.gif', ContentFile(SMALL_GIF))
+        used = time.time() - 3600
+        os.utime(legacy.path(name), (used, used))
+        post = Post.objects.create(
+            text='Пост', author=author, group=group, image=name
+        )
+        scopes = versions.post_scopes(post)
+        before = [versions.get(*scope) for scope in scopes]
+        call_command('readdress_media', stdout=mock.Mock())
+        for scope, version in zip(scopes, before):
+            self.assertNotEqual(versions.get(*scope), version, scope)
+        self.assertNotIn(name, media.orphans(60))
+        self.assertIn(name, media.orphans(-60))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CollectMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.storage = FileSystemStorage(location=TEMP_MEDIA_ROOT)
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_file(self, name, size=1, age=0):
+        name = self.storage.save(name, ContentFile(b'x' * size))
+        used = time.time() - age
+        os.utime(self.storage.path(name), (used, used))
+        return name
+
+    def test_orphans_are_removed_after_grace_period(self):
+        """Удаляются только файлы без постов старше срока ожидания."""
+        author = User.objects.create_user(username='author')
+        used = self.create_file('posts/used.gif', age=3600)
+        old = self.create_file('posts/old.gif', age=3600)
+        fresh = self.create_file('posts/fresh.gif')
+        Post.objects.create(text='Пост', author=author, image=used)
+        call_command(
+            'collect_media', grace=60, batch_size=1, stdout=mock.Mock()
+        )
+        self.assertTrue(self.storage.exists(used))
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(fresh))
+
+    def test_thumbnail_cache_keeps_recently_used_within_budget(self):
+        """Сверх бюджета удаляются самые давно читанные миниатюры."""
+        oldest = self.create_file('cache/a/oldest.jpg', 10, age=3000)
+        older = self.create_file('cache/b/older.jpg', 10, age=2000)
+        old = self.create_file('cache/c/old.jpg', 10, age=1000)
+        recent = self.create_file('cache/d/recent.jpg', 10, age=10)
+        self.assertEqual(
+            thumbnails.stale(budget=25, grace=60),
+            [(oldest, 10), (older, 10)]
+        )
+        self.assertEqual(thumbnails.stale(budget=10, grace=60), [
+            (oldest, 10), (older, 10), (old, 10)
+        ])
+        self.assertEqual(thumbnails.stale(budget=40, grace=60), [])
+        with mock.patch.object(default.kvstore, 'delete') as forgotten:
+            call_command(
+                'collect_media', budget=25, grace=60, stdout=mock.Mock()
+            )
+        self.assertEqual(forgotten.call_count, 2)
+        self.assertEqual(
+            [self.storage.exists(name)
+             for name in (oldest, older, old, recent)],
+            [False, False, True, True]
+        )
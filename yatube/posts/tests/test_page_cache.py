@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+AUTHOR = 'author'
+MAIN_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=['group'])
+OTHER_GROUP_URL = reverse('posts:group_list', args=['other'])
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR])
+
+
+class GuestPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.POST_URL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.URLS = [MAIN_URL, GROUP_URL, PROFILE_URL, cls.POST_URL]
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def assert_cached(self, url, cached=True):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(not response.templates, cached, url)
+        if cached:
+            self.assertEqual(len(queries), 0)
+        return response
+
+    def test_guest_pages_are_cached(self):
+        """Повторный запрос гостя отдается из кэша без базы и шаблонов."""
+        for url in self.URLS + [f'{MAIN_URL}?page=1']:
+            with self.subTest(url=url):
+                self.assert_cached(url, cached=False)
+                response = self.assert_cached(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('max-age=', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                self.assertEqual(self.guest.head(url).status_code, 200)
+
+    def test_only_page_params_are_cached(self):
+        """Посторонние параметры не заводят записей в кэше."""
+        self.assert_cached(f'{MAIN_URL}?page=1&cursor=', cached=False)
+        self.assert_cached(f'{MAIN_URL}?cursor=&page=1')
+        for _ in range(2):
+            self.assert_cached(f'{MAIN_URL}?utm_source=mail', cached=False)
+
+    def test_cached_page_answers_304(self):
+        """Страница из кэша проверяет ETag клиента."""
+        etag = self.assert_cached(self.POST_URL, cached=False)['ETag']
+        self.assert_cached(self.POST_URL)
+        response = self.guest.get(self.POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_users_are_not_cached(self):
+        """Страницы пользователя собираются заново и помечены private."""
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assert_cached(url, cached=False)
+                response = self.author_client.get(url)
+                self.assertTrue(response.templates)
+                self.assertIn('private', response['Cache-Control'])
+
+    def test_post_edit_purges_its_pages(self):
+        """Правка поста сбрасывает его страницы и только их."""
+        for url in self.URLS + [OTHER_GROUP_URL]:
+            self.assert_cached(url, cached=False)
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Новый текст', 'group': self.group.pk}
+        )
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.assert_cached(url, cached=False), 'Новый текст'
+                )
+        self.assert_cached(OTHER_GROUP_URL)
+
+    def test_comment_purges_post_page(self):
+        """Комментарий сбрасывает страницу поста, но не ленты."""
+        for url in self.URLS:
+            self.assert_cached(url, cached=False)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        self.assertContains(
+            self.assert_cached(self.POST_URL, cached=False), 'Комментарий'
+        )
+        for url in (MAIN_URL, GROUP_URL):
+            with self.subTest(url=url):
+                self.assert_cached(url)
+
+    def test_previous_fragment_is_not_cached(self):
+        """Страница с фрагментом прежней версии идет без ETag и кэша."""
+        self.assert_cached(GROUP_URL, cached=False)
+        key = make_template_fragment_key(
+            'group_page', [self.group.pk, GROUP_URL]
+        )
+        # Фрагмент новой версии как будто собирает другой процесс.
+        cache.add(f'{key}:lock', 1)
+        Post.objects.create(text='Новый', author=self.author, group=self.group)
+        response = self.assert_cached(GROUP_URL, cached=False)
+        self.assertNotContains(response, 'Новый')
+        self.assertFalse(response.has_header('ETag'))
+        cache.delete(f'{key}:lock')
+        self.assertContains(
+            self.assert_cached(GROUP_URL, cached=False), 'Новый'
+        )
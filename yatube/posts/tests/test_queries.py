@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+READER = 'reader'
+AUTHORS = ('author_1', 'author_2', 'author_3')
+SLUG = 'test_slug'
+MAIN_URL = reverse('posts:index')
+FOLLOW_URL = reverse('posts:follow_index')
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=[AUTHORS[0]])
+SEARCH_URL = reverse('posts:search')
+AUTOCOMPLETE_URL = reverse('posts:autocomplete', args=['groups'])
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов страниц не растет с числом постов и комментариев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username=READER)
+        authors = [
+            User.objects.create_user(username=name) for name in AUTHORS
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'{SLUG}{i or ""}',
+                description='Описание'
+            )
+            for i in range(2)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=authors[i % len(authors)],
+                group=groups[i % len(groups)]
+            )
+            for i in range(settings.MAX_POSTS * 2)
+        ]
+        for i, author in enumerate(authors * 3):
+            Comment.objects.create(
+                post=posts[-1], author=author, text=f'Комментарий {i}'
+            )
+        cls.POST_URL = reverse('posts:post_detail', args=[posts[-1].pk])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assert_budget(self, url, client):
+        budget = resolve(url.split('?')[0]).func.query_budget
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            '\n'.join(query['sql'] for query in queries)
+        )
+
+    def test_cached_fragment_skips_page_query(self):
+        """Фрагмент ленты из кэша не читает записи страницы."""
+        cache.clear()
+        self.client.get(MAIN_URL)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(MAIN_URL), 'Пост')
+        self.assertFalse([
+            query for query in queries
+            if 'FROM "posts_post"' in query['sql']
+        ], '\n'.join(query['sql'] for query in queries))
+
+    def test_views_stay_within_budget(self):
+        """Ленты и страница поста укладываются в объявленный бюджет."""
+        urls = [MAIN_URL, GROUP_URL, PROFILE_URL, FOLLOW_URL, self.POST_URL]
+        urls += [f'{SEARCH_URL}?q=Пост', f'{AUTOCOMPLETE_URL}?q=test']
+        urls += [f'{url}?page=2' for url in urls[:4]]
+        for url in urls:
+            for client in (self.client, Client()):
+                if url.startswith(FOLLOW_URL) and client is not self.client:
+                    continue
+                with self.subTest(url=url, client=client):
+                    self.assert_budget(url, client)
@@ -17,7 +17,10 @@ TEST_URLS = [
     ['follow_index', '/follow/', []],
     ['profile_follow', f'/profile/{USERNAME}/follow/', [USERNAME]],
     ['profile_unfollow', f'/profile/{USERNAME}/unfollow/', [USERNAME]],
-    ['add_comment', f'/posts/{POST_ID}/comment/', [POST_ID]]
+    ['add_comment', f'/posts/{POST_ID}/comment/', [POST_ID]],
+    ['post_comments', f'/posts/{POST_ID}/comments/', [POST_ID]],
+    ['search', '/search/', []],
+    ['autocomplete', '/autocomplete/groups/', ['groups']],
 ]
 
 
@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+
+SEARCH_URL = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.cat = Post.objects.create(
+            text='Кот <b>спит</b> на ёлке', author=cls.author
+        )
+        cls.cats = Post.objects.create(
+            text='Коты, коты и еще раз коты', author=cls.author
+        )
+        cls.dog = Post.objects.create(text='Собака лает', author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(SEARCH_URL, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response, list(response.context['page_obj'])
+
+    def test_search_russian_word_forms(self):
+        """Находятся другие формы слова и «ё» вместо «е»."""
+        cases = {
+            'котами': [self.cats, self.cat],
+            'КОТ': [self.cats, self.cat],
+            'елка': [self.cat],
+            'лает собаку': [self.dog],
+            'слон': [],
+            '': [],
+        }
+        for query, posts in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query)[1], posts)
+
+    def test_search_snippet_is_escaped_and_highlighted(self):
+        """Найденные слова подсвечены, HTML из текста экранирован."""
+        response, _ = self.found('спит')
+        self.assertContains(response, '<mark>спит</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_search_index_follows_edits(self):
+        """Правка и удаление поста сразу отражаются в поиске."""
+        dog = Post.objects.get(pk=self.dog.pk)
+        dog.text = 'Собака спит'
+        dog.save()
+        self.assertIn(dog, self.found('спит')[1])
+        dog.delete()
+        self.assertNotIn(dog, self.found('спит')[1])
+        self.assertEqual(self.found('собака')[1], [])
+
+    def test_search_cursor(self):
+        """Результаты листаются курсором без повторов и пропусков."""
+        Post.objects.bulk_create(
+            Post(text=f'Кот номер {i}', author=self.author)
+            for i in range(settings.MAX_POSTS)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response, first = self.found('кот')
+        cursor = response.context['page_obj'].next_cursor
+        response, second = self.found('кот', cursor=cursor)
+        self.assertEqual(len(first), settings.MAX_POSTS)
+        self.assertEqual(len(first + second), settings.MAX_POSTS + 2)
+        self.assertEqual(len(set(first + second)), settings.MAX_POSTS + 2)
+        previous = response.context['page_obj'].previous_cursor
+        self.assertEqual(self.found('кот', cursor=previous)[1], first)
@@ -0,0 +1,163 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..cards import card_key, render_cards
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MAIN_URL = reverse('posts:index')
+
+
+def png(width, height):
+    output = BytesIO()
+    Image.new('RGB', (width, height)).save(output, 'PNG')
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        with mock.patch.object(thumbnails, 'queue_on_commit') as queued:
+            post = Post.objects.create(
+                text='Пост с картинкой', author=self.author,
+                image=SimpleUploadedFile(name, content)
+            )
+        queued.assert_called_once_with(post.image.name)
+        return post
+
+    def test_page_falls_back_until_thumbnail_is_ready(self):
+        """Без миниатюры страница показывает исходную картинку."""
+        post = self.create_post('large.png', png(1600, 600))
+        with mock.patch.object(thumbnails, 'queue_on_commit') as queued:
+            response = self.client.get(MAIN_URL)
+        queued.assert_called_with(post.image.name)
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertFalse(thumbnails.ready(post.image))
+        thumbnails.generate(post.image.name)
+        self.assertTrue(thumbnails.ready(post.image))
+        response = self.client.get(MAIN_URL)
+        self.assertNotContains(response, f'src="{post.image.url}"')
+        self.assertContains(response, 'src="/media/cache/')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(
+            response, ' 480w, ', count=len(thumbnails.FORMATS)
+        )
+
+    def test_small_source_is_not_upscaled(self):
+        """Ширины больше исходника не попадают в srcset."""
+        for size, widths in (((1000, 400), [480, 960]), ((300, 200), [])):
+            with self.subTest(size=size):
+                cache.clear()
+                post = self.create_post('source.png', png(*size))
+                thumbnails.generate(post.image.name)
+                self.assertTrue(thumbnails.ready(post.image))
+                found = thumbnails.variants(post.image) or {}
+                self.assertEqual(
+                    [width for _, width in found.get('JPEG', [])], widths
+                )
+
+    def test_evicted_thumbnail_leaves_pages(self):
+        """После удаления миниатюры страницы на нее не ссылаются."""
+        post = self.create_post('large.png', png(1600, 600))
+        thumbnails.generate(post.image.name)
+        url = thumbnails.variants(post.image)['JPEG'][0][0]
+        self.assertContains(self.client.get(MAIN_URL), url)
+        with mock.patch.object(thumbnails, 'queue_on_commit'):
+            call_command(
+                'collect_media', budget=0, grace=-60, stdout=StringIO()
+            )
+            self.assertNotContains(self.client.get(MAIN_URL), url)
+
+    def test_queue_skips_files_already_queued(self):
+        """Файл ставится в очередь пула один раз."""
+        with mock.patch.object(thumbnails, 'pool') as pool:
+            thumbnails.queue('posts/a.gif')
+            thumbnails.queue('posts/a.gif')
+            thumbnails.queue('posts/b.gif')
+        self.assertEqual(pool.submit.call_count, 2)
+
+    def test_failed_file_is_not_queued_again(self):
+        """После неудачи файл не ставится в очередь до истечения флага."""
+        thumbnails.generate('posts/missing.gif')
+        with mock.patch.object(thumbnails, 'pool') as pool:
+            thumbnails.queue('posts/missing.gif')
+        pool.submit.assert_not_called()
+
+    def test_sizes_follow_settings(self):
+        """Размеры миниатюр читаются из настроек при каждом вызове."""
+        with override_settings(POST_IMAGE_WIDTHS=(320,)):
+            self.assertEqual(
+                [geometry for geometry, _ in thumbnails.sizes()],
+                ['320x113'] * len(thumbnails.FORMATS)
+            )
+
+    def test_unchanged_image_is_not_queued_again(self):
+        """Сохранение поста без новой картинки не создает работы пулу."""
+        post = self.create_post()
+        with mock.patch.object(thumbnails, 'queue_on_commit') as queued:
+            post.text = 'Новый текст'
+            post.save()
+        queued.assert_not_called()
+
+    def test_page_thumbnails_are_read_in_one_batch(self):
+        """Миниатюры карточек страницы читаются одним пакетом."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author,
+                 image=f'posts/batch-{i}.gif')
+            for i in range(settings.MAX_POSTS)
+        )
+        posts = list(Post.objects.select_related('author', 'group'))
+        backend = thumbnails.DeferredThumbnailBackend()
+        for post in posts:
+            for geometry, options in thumbnails.sizes():
+                thumbnail = backend.thumbnail_file(
+                    post.image, geometry, **options
+                )
+                thumbnail.set_size((960, 339))
+                default.kvstore.set(thumbnail)
+        lookups = 2 * len(posts) * len(thumbnails.sizes())
+        for prefetch, round_trips in ((False, lookups), (True, 1)):
+            with self.subTest(prefetch=prefetch):
+                cache.delete_many([card_key(post) for post in posts])
+                with override_settings(THUMBNAIL_PREFETCH=prefetch):
+                    default.kvstore.round_trips = 0
+                    cards = render_cards(posts)
+                self.assertEqual(default.kvstore.round_trips, round_trips)
+                self.assertEqual(
+                    sum('src="/media/cache/' in card for card in cards),
+                    len(posts)
+                )
@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.storage import is_addressed
+
+from .. import uploads
+from ..forms import PostForm
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CREATE_URL = reverse('posts:post_create')
+ORIENTATION = 0x0112
+
+
+def image_file(name='photo.jpg', size=(40, 20), image_format='JPEG',
+               rotated=False):
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    if rotated:
+        exif[ORIENTATION] = 6
+    output = io.BytesIO()
+    Image.new('RGB', size, (255, 0, 0)).save(
+        output, image_format, exif=exif.tobytes()
+    )
+    return SimpleUploadedFile(name, output.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_image_is_normalized(self):
+        """EXIF убирается, поворот применяется, большая сторона уменьшается."""
+        with override_settings(UPLOAD_MAX_SIDE=30):
+            normalized = uploads.process(image_file(rotated=True))
+        image = Image.open(normalized)
+        self.assertEqual(image.size, (15, 30))
+        self.assertFalse(dict(image.getexif()))
+        self.assertEqual(normalized.name, 'photo.jpg')
+
+    def test_animation_keeps_all_frames(self):
+        """Все кадры анимации уменьшаются и сохраняются."""
+        frames = [
+            Image.new('RGB', (40, 20), color) for color in ('red', 'blue')
+        ]
+        output = io.BytesIO()
+        frames[0].save(
+            output, 'GIF', save_all=True, append_images=frames[1:],
+            duration=[100, 200], comment=b'metadata'
+        )
+        upload = SimpleUploadedFile('anim.gif', output.getvalue())
+        with override_settings(UPLOAD_MAX_SIDE=30):
+            image = Image.open(uploads.process(upload))
+        self.assertEqual((image.n_frames, image.size), (2, (30, 15)))
+        self.assertNotIn('comment', image.info)
+        with override_settings(UPLOAD_MAX_PIXELS=1000):
+            with self.assertRaisesMessage(ValidationError, 'кадров'):
+                uploads.process(upload)
+
+    def test_post_create_stores_normalized_image(self):
+        """Пост сохраняется с уже нормализованной картинкой."""
+        response = self.client.post(CREATE_URL, {
+            'text': 'Пост',
+            'image': image_file('photo.bmp', image_format='BMP'),
+        })
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get()
+        self.assertTrue(is_addressed(post.image.name))
+        self.assertTrue(post.image.name.endswith('.png'))
+        self.assertFalse(dict(Image.open(post.image).getexif()))
+
+    def test_rejected_uploads(self):
+        """Повреждения и превышение лимитов дают ошибку поля image."""
+        cases = {
+            'не картинка': (
+                SimpleUploadedFile('a.jpg', b'not an image', 'image/jpeg'),
+                {}
+            ),
+            'пиксели': (image_file(), {'UPLOAD_MAX_PIXELS': 100}),
+            'байты': (image_file(), {'UPLOAD_MAX_BYTES': 10}),
+        }
+        for case, (upload, limits) in cases.items():
+            with self.subTest(case=case), override_settings(**limits):
+                form = PostForm({'text': 'Пост'}, {'image': upload})
+                self.assertFalse(form.is_valid())
+                self.assertIn('image', form.errors)
+        self.assertFalse(Post.objects.exists())
+
+    def test_request_waits_with_timeout(self):
+        """Запрос не ждет пул дольше UPLOAD_TIMEOUT."""
+        pool = mock.Mock()
+        pool.submit.return_value = Future()
+        with mock.patch.object(uploads.pool, 'get', return_value=pool), \
+                override_settings(UPLOAD_TIMEOUT=0.01):
+            form = PostForm({'text': 'Пост'}, {'image': image_file()})
+            self.assertFalse(form.is_valid())
+        self.assertIn('долго', form.errors['image'][0])
+
+    def test_stuck_worker_is_stopped(self):
+        """Процессы пула с зависшей картинкой останавливаются."""
+        future = Future()
+        future.set_running_or_notify_cancel()
+        stuck = mock.Mock(_processes={1: mock.Mock()})
+        stuck.submit.return_value = future
+        with mock.patch.multiple(
+            uploads.pool, executor=stuck, pid=os.getpid()
+        ), override_settings(UPLOAD_TIMEOUT=0.01):
+            with self.assertRaisesMessage(ValidationError, 'долго'):
+                uploads.process(image_file())
+            self.assertIsNone(uploads.pool.executor)
+        stuck._processes[1].terminate.assert_called_once_with()
+        stuck.shutdown.assert_called_once_with(wait=False)
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -76,6 +77,10 @@ class PostsURLTests(TestCase):
         )
         cls.POST_EDIT_REDIRECT = f'{LOGIN}?next={cls.EDIT_POST_URL}'
 
+    def setUp(self):
+        # Страницы гостей кэшируются целиком и без шаблонов.
+        cache.clear()
+
     # 1. Проверка запросов к страницам
     def test_url_exists(self):
         """Проверка доступности адресов любого клиента"""
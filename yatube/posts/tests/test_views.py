@@ -1,13 +1,18 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
 from django.conf import settings
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from ..models import Group, Post, User, Follow
+from core.templatetags.pagination import page_window
+from .. import versions
+from ..models import Comment, Group, Post, User, Follow
 POSTS_SECOND_PAGE = 3
 NIK_1 = 'test_user'
 NIK_2 = 'test_author'
@@ -128,6 +133,10 @@ class PostsPagesTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        # Кэш общий для процессов и переживает прошлые запуски тестов.
+        cache.clear()
+
     def test_show_correct_context(self):
         """Шаблоны index,group,profile,follow,post_detail"""
         """сформированы с правильным контекстом."""
@@ -179,10 +188,6 @@ class PostsPagesTests(TestCase):
     def test_paginator(self):
         Post.objects.all().delete()
         COUNT = settings.MAX_POSTS + POSTS_SECOND_PAGE
-        Follow.objects.create(
-            author=self.author_test,
-            user=self.user_test,
-        )
         Post.objects.bulk_create(
             Post(
                 text=f"Тестовый текст{i}",
@@ -191,6 +196,15 @@ class PostsPagesTests(TestCase):
             )
             for i in range(COUNT)
         )
+        # bulk_create не шлет сигналов, поэтому лента подписок
+        # заполняется при подписке, уже после создания постов,
+        # а счетчики постов пересчитываются отдельно.
+        Follow.objects.create(
+            author=self.author_test,
+            user=self.user_test,
+        )
+        call_command('reconcile_counters', stdout=StringIO())
+        cache.clear()
         urls = {
             MAIN_URL: settings.MAX_POSTS,
             MAIN_PAGE_PAGINATOR_SECOND: POSTS_SECOND_PAGE,
@@ -207,16 +221,126 @@ class PostsPagesTests(TestCase):
                     len(self.authorized.get(url).context['page_obj']), number
                 )
 
+    def test_cursor_paginator(self):
+        """Лента листается по курсору в обе стороны."""
+        Post.objects.all().delete()
+        Post.objects.bulk_create(
+            Post(
+                text=f"Тестовый текст{i}",
+                author=self.author_test,
+                group=self.group_2
+            )
+            for i in range(settings.MAX_POSTS + POSTS_SECOND_PAGE)
+        )
+        for url in (MAIN_URL, GROUP_URL_2, PROFILE_URL):
+            with self.subTest(url=url):
+                cache.clear()
+                first = self.guest.get(url).context['page_obj']
+                self.assertEqual(len(first), settings.MAX_POSTS)
+                self.assertIsNone(first.previous_cursor)
+                cache.clear()
+                second = self.guest.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), POSTS_SECOND_PAGE)
+                self.assertIsNone(second.next_cursor)
+                self.assertFalse(set(first) & set(second))
+                cache.clear()
+                back = self.guest.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_cursor_paginator_invalid_cursor(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.guest.get(PROFILE_URL, {'cursor': 'испорчен'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    @override_settings(MAX_COMMENTS=2)
+    def test_post_detail_comments_paginated(self):
+        """На странице поста только новые комментарии, остальные —
+        во фрагменте по курсору."""
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.user_test, text=f'Текст {i}'
+            )
+            for i in range(3)
+        ]
+        page = self.guest.get(self.POST_PAGE_URL).context['comments']
+        self.assertEqual(list(page), comments[:0:-1])
+        response = self.guest.get(
+            reverse('posts:post_comments', args=[self.post.id]),
+            {'cursor': page.next_cursor}
+        )
+        self.assertEqual(list(response.context['comments']), comments[:1])
+        self.assertIsNone(response.context['comments'].next_cursor)
+        self.assertNotContains(response, 'data-more-comments')
+
     def test_index_cache(self):
         """Проверка кэша на странице на главной странице."""
         response_1 = self.authorized.get(MAIN_URL)
-        Post.objects.all().delete()
+        # update() не шлет сигналов и не меняет версию ленты.
+        Post.objects.update(text='Изменено в обход сигналов')
         response_2 = self.authorized.get(MAIN_URL)
         self.assertEqual(response_1.content, response_2.content)
         cache.clear()
         response_3 = self.authorized.get(MAIN_URL)
         self.assertNotEqual(response_2.content, response_3.content)
 
+    def test_feed_cache_invalidation(self):
+        """Создание, правка и удаление поста сразу видны в лентах."""
+        urls = (MAIN_URL, GROUP_URL, PROFILE_URL)
+        for url in urls:
+            self.guest.get(url)
+        post = Post.objects.create(
+            text='Свежий пост', author=self.author_test, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest.get(url), 'Свежий пост')
+        post.text = 'Исправленный пост'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest.get(url), 'Исправленный пост')
+        post.group = self.group_2
+        post.save()
+        self.assertNotContains(self.guest.get(GROUP_URL), 'Исправленный')
+        self.assertContains(self.guest.get(GROUP_URL_2), 'Исправленный')
+        post.delete()
+        for url in urls + (GROUP_URL_2,):
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest.get(url), 'Исправленный')
+
+    def test_feed_cache_varies_by_page(self):
+        """Каждая страница ленты кэшируется отдельно."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост номер {i}', author=self.author_test)
+            for i in range(settings.MAX_POSTS)
+        )
+        cache.clear()
+        first = self.guest.get(MAIN_URL)
+        cursor = first.context['page_obj'].next_cursor
+        second = self.guest.get(MAIN_URL, {'cursor': cursor})
+        self.assertContains(second, POST_TEST)
+        self.assertNotContains(first, POST_TEST)
+
+    def test_post_card_cache(self):
+        """Карточка поста берется из кэша, пока пост не изменен."""
+        # Карточки с картинкой без готовой миниатюры не кэшируются.
+        post = Post.objects.create(
+            text='Пост без картинки', author=self.author_test
+        )
+        self.guest.get(MAIN_URL)
+        Post.objects.update(text='Изменено в обход сигналов')
+        versions.bump('index')
+        self.assertContains(self.guest.get(MAIN_URL), 'Пост без картинки')
+        post.refresh_from_db()
+        post.save()
+        self.assertContains(
+            self.guest.get(MAIN_URL), 'Изменено в обход сигналов'
+        )
+
     def test_following(self):
         """Проверка подписки на автора."""
         followes_count = Follow.objects.count()
@@ -242,3 +366,20 @@ class PostsPagesTests(TestCase):
                 user=self.follower_user,
                 author=self.user_test).exists()
         )
+
+
+class PageWindowTests(TestCase):
+    def test_page_window(self):
+        """Навигация показывает края и окно вокруг текущей страницы."""
+        paginator = Paginator(range(1000), 10)
+        cases = {
+            1: [1, 2, 3, None, 100],
+            4: [1, 2, 3, 4, 5, 6, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    page_window(paginator.page(number)), expected
+                )
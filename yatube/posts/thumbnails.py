@@ -0,0 +1,283 @@
+"""Миниатюры картинок постов, создаваемые вне цикла запроса.
+
+Бэкенд DeferredThumbnailBackend (THUMBNAIL_BACKEND) отдает тегу
+{% thumbnail %} только уже готовые миниатюры; если миниатюры еще нет,
+он ставит файл в очередь и возвращает None, и шаблон показывает ветку
+{% empty %} с исходной картинкой. Миниатюры всех размеров из sizes()
+создает пул процессов THUMBNAIL_WORKERS: при сохранении поста с новой
+картинкой (после коммита) и при первом показе картинки без миниатюры.
+Повторная постановка того же файла, в том числе из других процессов,
+отсекается флагом в общем кэше; после неудачи флаг держится
+THUMBNAIL_QUEUE_TIMEOUT секунд, и битый файл не ставится в очередь
+при каждом показе. Готовые миниатюры поднимают версии постов с этой
+картинкой (posts.versions), и страницы, собранные с исходной картинкой,
+собираются заново. Размер каталога миниатюр ограничивает команда
+collect_media: давно не читанные миниатюры удаляются (stale, evict) и
+при следующем показе создаются заново, а карточки и страницы с ними
+сбрасывает refresh_cards.
+"""
+import heapq
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.pools import ProcessPool, spawn
+from core.storage import walk
+
+from . import versions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Варианты картинки поста: каждая ширина из POST_IMAGE_WIDTHS в JPEG
+# и, если Pillow собран с libwebp, в WebP. Пропорции — как у карточки.
+RATIO = 339 / 960
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+
+
+def image_variants():
+    """[(формат, ширина)] по текущим настройкам, а не на момент импорта."""
+    return [
+        (image_format, width) for image_format in FORMATS
+        for width in settings.POST_IMAGE_WIDTHS
+    ]
+
+
+def sizes():
+    """[(геометрия, опции sorl)] в порядке image_variants()."""
+    return [
+        (f'{width}x{round(width * RATIO)}',
+         {'crop': 'center', 'upscale': False, 'format': image_format})
+        for image_format, width in image_variants()
+    ]
+
+
+def _queued_key(name):
+    return f'thumbnail_queued:{name}'
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+pool = ProcessPool(
+    lambda: spawn(settings.THUMBNAIL_WORKERS, _setup_worker)
+)
+
+
+def generate(name):
+    """Создает миниатюры всех размеров для файла name (в процессе пула)."""
+    backend = ThumbnailBackend()
+    # Исходник лежит в хранилище поля Post.image, а не в хранилище
+    # миниатюр: от хранилища зависит и ключ миниатюры в sorl.
+    source = ImageFile(name, default_storage)
+    done = False
+    try:
+        for geometry, options in sizes():
+            backend.get_thumbnail(source, geometry, **options)
+        # Ошибку чтения исходника sorl только пишет в лог: готовность
+        # проверяется по хранилищу ключей.
+        done = ready(source)
+        if done:
+            refresh_pages(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        if done:
+            cache.delete(_queued_key(name))
+        else:
+            # Флаг очереди остается: битый файл не ставится в очередь
+            # при каждом показе.
+            cache.set(
+                _queued_key(name), 'failed', settings.THUMBNAIL_QUEUE_TIMEOUT
+            )
+        connections.close_all()
+
+
+def refresh_pages(name):
+    """Поднимает версии областей, где видны посты с картинкой name."""
+    scopes = {
+        scope
+        for post in Post.objects.filter(image=name).only(
+            'pk', 'author_id', 'group_id'
+        ).iterator()
+        for scope in versions.post_scopes(post)
+    }
+    for scope in scopes:
+        versions.bump(*scope)
+
+
+def queue(name):
+    """Ставит файл в очередь пула, если его там еще нет."""
+    if not cache.add(
+        _queued_key(name), True, settings.THUMBNAIL_QUEUE_TIMEOUT
+    ):
+        return
+    # Процесс пула мог упасть (например, на битом файле): тогда пул
+    # пересоздается.
+    pool.submit(generate, name)
+
+
+def forget(name):
+    """Удаляет миниатюры файла name и их записи в хранилище ключей."""
+    default.kvstore.delete(ImageFile(name, default_storage))
+
+
+def stale(budget, grace):
+    """Давно не читанные миниатюры, без которых каталог влезет в budget.
+
+    Возвращает список (имя, размер) от самой старой. Каталог миниатюр
+    обходится дважды: сначала считается общий размер, затем в куче
+    остаются только самые старые файлы, покрывающие превышение, — память
+    растет с числом удаляемых файлов, а не всех. Миниатюры, которые
+    читали или создавали последние grace секунд, не удаляются.
+    """
+    storage = default.storage
+    directory = thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/')
+    excess = sum(
+        storage.size(name) for name in walk(storage, directory)
+    ) - budget
+    if excess <= 0:
+        return []
+    deadline = timezone.now() - timedelta(seconds=grace)
+    heap, selected = [], 0
+    for name in walk(storage, directory):
+        used = max(
+            storage.get_accessed_time(name), storage.get_modified_time(name)
+        )
+        if used >= deadline:
+            continue
+        size = storage.size(name)
+        heapq.heappush(heap, (-used.timestamp(), name, size))
+        selected += size
+        # Самая свежая из выбранных не нужна, если без нее хватает.
+        while selected - heap[0][2] >= excess:
+            selected -= heapq.heappop(heap)[2]
+    return [(name, size) for _, name, size in sorted(heap, reverse=True)]
+
+
+def evict(name):
+    """Удаляет файл миниатюры; страница создаст его заново.
+
+    Карточки и страницы, где она показана, сбрасывает refresh_cards.
+    """
+    default.kvstore.delete(ImageFile(name, default.storage), False)
+    default.storage.delete(name)
+
+
+def refresh_cards(name):
+    """Собирает заново карточки и страницы постов с картинкой name.
+
+    Ключ карточки включает время правки поста, поэтому оно сдвигается,
+    как при переносе картинки (media.readdress).
+    """
+    Post.objects.filter(image=name).update(updated=timezone.now())
+    refresh_pages(name)
+
+
+def queue_on_commit(name):
+    transaction.on_commit(lambda: queue(name))
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который не создает миниатюры во время запроса."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, как его назовет sorl, без обращения к хранилищам."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(thumbnail_defaults, attr):
+                options.setdefault(key, value)
+        return ImageFile(
+            self._get_thumbnail_filename(source, geometry_string, options),
+            default.storage
+        )
+
+    def lookup(self, file_, geometry_string, **options):
+        """Готовая миниатюра из хранилища ключей или None."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        thumbnail = self.lookup(file_, geometry_string, **options)
+        if thumbnail is None:
+            queue_on_commit(file_.name if hasattr(file_, 'name') else file_)
+        return thumbnail
+
+
+def ready(file_):
+    """Готовы ли миниатюры всех размеров для картинки."""
+    backend = DeferredThumbnailBackend()
+    return all(
+        backend.lookup(file_, geometry, **options) is not None
+        for geometry, options in sizes()
+    )
+
+
+def variants(file_):
+    """Готовые варианты картинки по форматам: {формат: [(url, ширина)]}.
+
+    Если готовы не все варианты, файл ставится в очередь и возвращается
+    None: шаблон покажет исходную картинку. Миниатюры не увеличиваются,
+    и у исходника меньше заказанного размера они выходят меньше: такие
+    ширины в srcset не попадают, а если не подошла ни одна, тоже
+    возвращается None.
+    """
+    backend = DeferredThumbnailBackend()
+    found = {}
+    for (image_format, width), (geometry, options) in zip(
+        image_variants(), sizes()
+    ):
+        thumbnail = backend.lookup(file_, geometry, **options)
+        if thumbnail is None:
+            queue_on_commit(file_.name)
+            return None
+        if tuple(thumbnail.size) == (width, round(width * RATIO)):
+            found.setdefault(image_format, []).append(
+                (thumbnail.url, width)
+            )
+    return found or None
+
+
+def thumbnail_names(name):
+    """Имена миниатюр текущих размеров для картинки поста name."""
+    backend, source = DeferredThumbnailBackend(), ImageFile(
+        name, default_storage
+    )
+    return [
+        backend.thumbnail_file(source, geometry, **options).name
+        for geometry, options in sizes()
+    ]
+
+
+def prefetch(files):
+    """Блок, в котором миниатюры files читаются из одного get_many."""
+    if not settings.THUMBNAIL_PREFETCH:
+        return nullcontext()
+    backend, file_sizes = DeferredThumbnailBackend(), sizes()
+    return default.kvstore.prefetch(
+        backend.thumbnail_file(file_, geometry, **options)
+        for file_ in files
+        for geometry, options in file_sizes
+    )
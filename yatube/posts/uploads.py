@@ -0,0 +1,161 @@
+"""Проверка и нормализация загруженных картинок в изолированном пуле.
+
+Pillow разбирает картинку не в процессе веб-сервера, а в пуле процессов
+UPLOAD_WORKERS без Django. Процессу пула ограничена память (RLIMIT_AS,
+UPLOAD_MEMORY_LIMIT), на каждую картинку — время процессора
+(RLIMIT_CPU, UPLOAD_CPU_SECONDS; превысивший его процесс убивается) и
+число пикселей (UPLOAD_MAX_PIXELS проверяется до декодирования). Там же
+картинка поворачивается по EXIF, теряет метаданные при перекодировании
+и уменьшается до UPLOAD_MAX_SIDE по большей стороне; у анимированных
+GIF и WebP так обрабатывается каждый кадр, и сохраняются все кадры.
+Поток запроса только ждет результат не дольше UPLOAD_TIMEOUT секунд;
+не дождавшись, он останавливает процессы пула вместе с зависшей
+картинкой и пересоздает пул.
+"""
+import io
+import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from core.pools import ProcessPool, spawn
+
+# Форматы, которые сохраняются как есть; остальные переводятся в PNG.
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg', 'PNG': 'image/png',
+    'GIF': 'image/gif', 'WEBP': 'image/webp',
+}
+# Форматы, в которых сохраняются все кадры анимации.
+ANIMATED = ('GIF', 'WEBP')
+# Из сведений о кадре в файл идет только прозрачность: комментарии
+# и прочие метаданные отбрасываются.
+FRAME_INFO = ('transparency',)
+
+
+class ImageRejected(Exception):
+    """Картинку нельзя принять; текст исключения — для пользователя."""
+
+
+def _limit_memory(memory_limit):
+    import resource
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _limit_cpu(seconds):
+    # Лимит процессорного времени накопительный, поэтому мягкий лимит
+    # ставится от уже потраченного: каждая картинка получает seconds.
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + seconds
+    resource.setrlimit(
+        resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1])
+    )
+
+
+def _animation(image, max_side):
+    """Кадры анимации, уменьшенные по отдельности, и их длительности."""
+    from PIL import Image, ImageSequence
+
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frame = frame.copy()
+        frame.info = {
+            key: value for key, value in frame.info.items()
+            if key in FRAME_INFO
+        }
+        if max(frame.size) > max_side:
+            frame.thumbnail((max_side, max_side), Image.LANCZOS)
+        frames.append(frame)
+    return frames, durations
+
+
+def normalize(data, max_pixels, max_side, cpu_seconds):
+    """В процессе пула: (данные, формат) нормализованной картинки."""
+    from PIL import Image, ImageOps
+
+    _limit_cpu(cpu_seconds)
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        if width * height > max_pixels:
+            raise ImageRejected(
+                f'Изображение слишком большое: {width}×{height} пикселей'
+            )
+        frames = getattr(image, 'n_frames', 1)
+        if width * height * frames > max_pixels:
+            raise ImageRejected(
+                f'Анимация слишком большая: {frames} кадров {width}×{height}'
+            )
+        image_format = image.format if image.format in FORMATS else 'PNG'
+        output = io.BytesIO()
+        if frames > 1 and image_format in ANIMATED:
+            frames, durations = _animation(image, max_side)
+            frames[0].save(
+                output, image_format, save_all=True,
+                append_images=frames[1:], duration=durations,
+                loop=image.info.get('loop', 0)
+            )
+            return output.getvalue(), image_format
+        image.load()
+        image = ImageOps.exif_transpose(image)
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        # Метаданные (EXIF, текстовые блоки PNG) при сохранении не
+        # передаются и в файл не попадают.
+        image.save(output, image_format, **(
+            {'quality': 90} if image_format == 'JPEG' else {}
+        ))
+    except ImageRejected:
+        raise
+    except MemoryError:
+        raise ImageRejected('Изображение не помещается в память')
+    except Exception:
+        raise ImageRejected(
+            'Загрузите правильное изображение. Файл, который вы загрузили, '
+            'поврежден или не является изображением.'
+        )
+    return output.getvalue(), image_format
+
+
+pool = ProcessPool(lambda: spawn(
+    settings.UPLOAD_WORKERS, _limit_memory, (settings.UPLOAD_MEMORY_LIMIT,)
+))
+
+
+def process(uploaded):
+    """Нормализованная копия загруженной картинки или ValidationError."""
+    if uploaded.size > settings.UPLOAD_MAX_BYTES:
+        raise ValidationError('Файл изображения слишком большой')
+    uploaded.seek(0)
+    arguments = (
+        normalize, uploaded.read(), settings.UPLOAD_MAX_PIXELS,
+        settings.UPLOAD_MAX_SIDE, settings.UPLOAD_CPU_SECONDS
+    )
+    future = pool.submit(*arguments)
+    try:
+        data, image_format = future.result(timeout=settings.UPLOAD_TIMEOUT)
+    except ImageRejected as error:
+        raise ValidationError(str(error))
+    except FutureTimeoutError:
+        # Процесс с зависшей картинкой иначе декодировал бы ее дальше,
+        # пока его не убьет RLIMIT_CPU, и занимал бы место в пуле.
+        # Картинки других запросов в этом пуле тоже прерываются.
+        if not future.cancel():
+            pool.terminate()
+        raise ValidationError('Изображение обрабатывается слишком долго')
+    except BrokenProcessPool:
+        # Процесс пула убит лимитом памяти или процессорного времени.
+        pool.get(restart=True)
+        raise ValidationError('Изображение не удалось обработать')
+    name = os.path.splitext(os.path.basename(uploaded.name))[0] or 'image'
+    return SimpleUploadedFile(
+        f'{name}.{FORMATS[image_format]}', data, CONTENT_TYPES[image_format]
+    )
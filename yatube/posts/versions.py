@@ -0,0 +1,124 @@
+"""Версии содержимого для ключей кэша и условных GET.
+
+Ключ фрагмента включает версию области (лента, группа, профиль);
+запись в область поднимает версию, и старые фрагменты просто
+перестают читаться, а затем вытесняются по таймауту. Вместе с версией
+запоминается время изменения: из версий и времен областей страницы
+conditional строит ETag и Last-Modified, не обращаясь к базе.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+from .models import Post
+
+
+def _key(scope):
+    return 'version:' + ':'.join(str(part) for part in scope)
+
+
+def get(*scope):
+    # Начальное значение — время в наносекундах: если ключ версии
+    # вытеснят, новая версия все равно окажется больше любой прежней.
+    return cache.get_or_set(_key(scope), time.time_ns, None)
+
+
+def bump(*scope):
+    """Поднимает версию области и возвращает новое значение."""
+    cache.set(_modified_key(scope), time.time(), None)
+    try:
+        return cache.incr(_key(scope))
+    except ValueError:
+        version = time.time_ns()
+        cache.set(_key(scope), version, None)
+        return version
+
+
+def _modified_key(scope):
+    return 'modified:' + ':'.join(str(part) for part in scope)
+
+
+def stamp(scopes):
+    """(ETag, Last-Modified) по версиям областей — одним get_many."""
+    keys = [(_key(scope), _modified_key(scope)) for scope in scopes]
+    found = cache.get_many([key for pair in keys for key in pair])
+    versions, modified = [], []
+    for scope, (version_key, modified_key) in zip(scopes, keys):
+        versions.append(found.get(version_key) or get(*scope))
+        modified.append(found.get(modified_key) or cache.get_or_set(
+            modified_key, time.time, None
+        ))
+    etag = hashlib.md5(repr(list(zip(scopes, versions))).encode())
+    return etag.hexdigest(), datetime.fromtimestamp(
+        max(modified), timezone.utc
+    )
+
+
+def conditional(scopes, vary=None):
+    """Условный GET по версиям: при совпадении — 304 без вызова view.
+
+    scopes(request, *args, **kwargs) возвращает области, от которых
+    зависит ответ, или None, если валидатор не нужен. vary(request) —
+    строка, от которой страница зависит помимо данных (например,
+    CSRF-токен формы), или None. Она входит в ETag, а Last-Modified
+    тогда не отдается: по времени ее смену не отличить.
+    """
+    def get_stamp(request, *args, **kwargs):
+        if not hasattr(request, 'version_stamp'):
+            found = scopes(request, *args, **kwargs)
+            request.version_stamp = stamp(found) if found else (None, None)
+            extra = vary(request) if found and vary else None
+            if extra is not None:
+                etag = hashlib.md5(
+                    f'{request.version_stamp[0]}:{extra}'.encode()
+                ).hexdigest()
+                request.version_stamp = etag, None
+        return request.version_stamp
+
+    return condition(
+        etag_func=lambda *args, **kwargs: get_stamp(*args, **kwargs)[0],
+        last_modified_func=lambda *args, **kwargs: get_stamp(
+            *args, **kwargs
+        )[1],
+    )
+
+
+def post_author_id(post_id):
+    """Автор поста из кэша: он не меняется, база — только при промахе.
+
+    None — поста нет; по нему не стоит заводить ключи версий.
+    """
+    key = f'post_author:{post_id}'
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            cache.set(key, author_id, None)
+    return author_id
+
+
+def post_scopes(post, *group_ids):
+    """Области, в которых виден пост: сам пост, лента, группы, профиль."""
+    return [('post', post.pk), ('index',), ('profile', post.author_id)] + [
+        ('group', group_id)
+        for group_id in {post.group_id, *group_ids} - {None}
+    ]
+
+
+def bump_post(post, *group_ids):
+    scopes = post_scopes(post, *group_ids)
+
+    def bump_scopes():
+        for scope in scopes:
+            bump(*scope)
+
+    bump_scopes()
+    # Повторно после коммита: фрагменты, собранные другими процессами
+    # до коммита по старым данным, окажутся под устаревшей версией.
+    transaction.on_commit(bump_scopes)
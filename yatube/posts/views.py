@@ -1,39 +1,126 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.decorators import query_budget
+
+from . import counters, feeds, versions
+from .autocomplete import GROUPS, INDEXES, USERS
 from .forms import CommentForm, PostForm
 from .models import Group, Post, User, Follow
+from .page_cache import cache_for_guests
+from .paginators import CachedCountPaginator, CursorPaginator
+from .search import SearchPaginator, match_expression
+
 
+def paginator_page(post_list, request, count=None, count_key=None):
+    """Страница ленты: по курсору, а для старых ссылок — по ?page=.
 
-def paginator_page(post_list, request):
-    return Paginator(
+    Для ?page= число постов берется из count или из кэша по count_key.
+    """
+    if 'page' in request.GET:
+        return CachedCountPaginator(
+            post_list, settings.MAX_POSTS, count=count, count_key=count_key
+        ).get_page(request.GET.get('page'))
+    # Страница ленты выводится во фрагменте guarded_cache: если он
+    # в кэше, записи страницы не читаются.
+    return CursorPaginator(
         post_list, settings.MAX_POSTS
-    ).get_page(request.GET.get('page'))
+    ).get_lazy_page(request.GET.get('cursor'))
+
+
+# Страница показывает имена авторов и названия групп, а шапка и кнопки —
+# текущего пользователя: его профиль входит в области страницы, и у
+# гостя и у каждого пользователя свой ETag. Бюджеты этих страниц
+# учитывают запрос валидатора при холодном кэше (индекс имен, автор
+# поста); при совпадении ETag ответ 304 обходится сессией и
+# пользователем.
+def page_scopes(request, *scopes):
+    scopes = list(scopes) + [('users',), ('groups',)]
+    if request.user.is_authenticated:
+        scopes.append(('profile', request.user.pk))
+    return scopes
+
+
+def viewer_token(request):
+    """CSRF-cookie пользователя для ETag страниц с формой.
+
+    Вход выдает новую cookie, и страница, сохраненная до него, с прежним
+    токеном в форме уже не совпадет по ETag.
+    """
+    if request.user.is_authenticated:
+        return request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return None
+
 
+def index_scopes(request):
+    return page_scopes(request, ('index',))
 
+
+def post_scopes(request, post_id):
+    # Рядом с постом — число постов автора.
+    author_id = versions.post_author_id(post_id)
+    if author_id is None:
+        return None
+    return page_scopes(request, ('post', post_id), ('profile', author_id))
+
+
+def group_scopes(request, slug):
+    pk = GROUPS.find(slug)
+    return page_scopes(request, ('group', pk)) if pk else None
+
+
+def profile_scopes(request, username):
+    pk = USERS.find(username)
+    return page_scopes(request, ('profile', pk)) if pk else None
+
+
+@cache_for_guests(index_scopes)
+@query_budget(4)
 def index(request):
     return render(request, 'posts/index.html', {
-        'page_obj': paginator_page(Post.objects.all(), request),
+        'page_obj': paginator_page(
+            Post.objects.select_related('author', 'group'), request,
+            count_key='index'
+        ),
+        'feed_version': versions.get('index'),
     })
 
 
+@cache_for_guests(group_scopes)
+@versions.conditional(group_scopes, vary=viewer_token)
+@query_budget(6)
 def group_posts(request, slug):
     """Получение постов нужной группы по запросу"""
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': paginator_page(group.posts.all(), request)
+        'page_obj': paginator_page(
+            group.posts.select_related('author', 'group'), request,
+            count_key=f'group:{group.pk}'
+        ),
+        'feed_version': versions.get('group', group.pk),
     })
 
 
+@cache_for_guests(profile_scopes)
+@versions.conditional(profile_scopes, vary=viewer_token)
+@query_budget(7)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    counters.get_stats(author)
     return render(
         request, 'posts/profile.html', {
             'author': author,
-            'page_obj': paginator_page(author.posts.all(), request),
+            'page_obj': paginator_page(
+                author.posts.select_related('author', 'group'), request,
+                count=author.stats.posts_count
+            ),
+            'feed_version': versions.get('profile', author.pk),
             'following': (
                 request.user.is_authenticated
                 and request.user.username != username
@@ -46,14 +133,62 @@ def profile(request, username):
     )
 
 
+def comments_page(post, cursor=None):
+    """Самые новые MAX_COMMENTS комментариев после курсора."""
+    return CursorPaginator(
+        post.comments.select_related('author'), settings.MAX_COMMENTS
+    ).get_page(cursor)
+
+
+@cache_for_guests(post_scopes)
+@versions.conditional(post_scopes, vary=viewer_token)
+@query_budget(5)
 def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    counters.get_stats(post.author)
     return render(request, 'posts/post_detail.html', {
-        'post': get_object_or_404(Post, pk=post_id),
+        'post': post,
+        'comments': comments_page(post),
         'form': CommentForm(),
     })
 
 
+@query_budget(4)
+def post_comments(request, post_id):
+    """Фрагмент со следующей порцией более ранних комментариев."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return render(request, 'posts/includes/comment_list.html', {
+        'post': post,
+        'comments': comments_page(post, request.GET.get('cursor')),
+    })
+
+
+@query_budget(5)
+def search(request):
+    """Поиск постов по тексту, самые релевантные первыми."""
+    query = request.GET.get('q', '').strip()
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': SearchPaginator(
+            match_expression(query), settings.MAX_POSTS
+        ).get_page(request.GET.get('cursor')),
+    })
+
+
+@query_budget(1)
+def autocomplete(request, index):
+    """Подсказки групп или пользователей по началу адреса или имени."""
+    if index not in INDEXES:
+        raise Http404
+    return JsonResponse({
+        'results': INDEXES[index].search(request.GET.get('q', ''))
+    })
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -69,6 +204,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
@@ -88,6 +224,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -100,16 +237,22 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(5)
 def follow_index(request):
-    return render(request, 'posts/follow.html', {
-        'page_obj': paginator_page(
-            Post.objects.filter(author__following__user=request.user),
-            request
+    if 'page' in request.GET:
+        page = paginator_page(
+            feeds.follow_posts(request.user), request,
+            count_key=f'follow:{request.user.pk}'
         )
-    })
+    else:
+        page = feeds.FeedPaginator(
+            request.user, settings.MAX_POSTS
+        ).get_page(request.GET.get('cursor'))
+    return render(request, 'posts/follow.html', {'page_obj': page})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     if not (request.user.username == username or Follow.objects.filter(
             author__username=username, user=request.user).exists()):
@@ -121,6 +264,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     get_object_or_404(
         Follow,
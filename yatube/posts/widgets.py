@@ -0,0 +1,44 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """Выпадающий список, в котором есть только выбранный вариант.
+
+    Остальные варианты не загружаются из базы: их подставляет скрипт
+    страницы по мере ввода, запрашивая подсказки по адресу
+    posts:autocomplete для индекса index (атрибут data-autocomplete).
+    """
+
+    def __init__(self, index, attrs=None):
+        super().__init__(attrs)
+        self.index = index
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete'] = reverse(
+            'posts:autocomplete', args=[self.index]
+        )
+        return context
+
+    def selected_choices(self, values):
+        iterator = self.choices
+        field = iterator.field
+        choices = [('', field.empty_label)] if field.empty_label else []
+        try:
+            selected = iterator.queryset.filter(**{
+                f'{field.to_field_name or "pk"}__in': [
+                    value for value in values if value
+                ]
+            })
+            return choices + [iterator.choice(obj) for obj in selected]
+        except (TypeError, ValueError):
+            return choices
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        self.choices = self.selected_choices(value)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
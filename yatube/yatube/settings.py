@@ -42,12 +42,15 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
+    'jobs.apps.JobsConfig',
+    'api.apps.ApiConfig',
     # 'debug_toolbar',
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'posts.page_cache.GuestPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,6 +61,77 @@ MIDDLEWARE = [
 ]
 
 MAX_POSTS = 10
+MAX_COMMENTS = 20
+# Сколько секунд страницы ленты считают по закэшированному числу постов
+PAGINATOR_COUNT_TIMEOUT = 60
+# Сколько секунд хранится страница гостя в кэше и сколько секунд ее
+# могут хранить браузеры и прокси
+GUEST_PAGE_TIMEOUT = 60 * 5
+GUEST_PAGE_MAX_AGE = 10
+# Дорогие значения кэша (core.cache.guarded): сколько секунд после
+# срока свежести отдается прежнее значение, на сколько секунд берется
+# блокировка пересчета и насколько рано пересчет может начаться
+CACHE_STALE_TIMEOUT = 60 * 5
+CACHE_LOCK_TIMEOUT = 10
+CACHE_EARLY_BETA = 1
+# Сколько секунд хранится отрисованная карточка поста
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Размер пачки при заполнении и очистке ленты подписок
+TIMELINE_BATCH_SIZE = 500
+# Посты авторов, у которых подписчиков больше порога, не раскладываются
+# по лентам при публикации, а подмешиваются в ленту при чтении
+FEED_PUSH_THRESHOLD = 1000
+# Миниатюры создаются в пуле процессов, а не во время запроса
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+# Загруженные картинки проверяются в пуле процессов с лимитами
+UPLOAD_WORKERS = 2
+UPLOAD_TIMEOUT = 15
+UPLOAD_CPU_SECONDS = 10
+UPLOAD_MEMORY_LIMIT = 1024 * 2 ** 20
+UPLOAD_MAX_BYTES = 20 * 2 ** 20
+UPLOAD_MAX_PIXELS = 50 * 10 ** 6
+# Большая сторона оригинала уменьшается до этого размера
+UPLOAD_MAX_SIDE = 2560
+# Картинки хранятся под именами по содержимому, миниатюры — как есть
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# collect_media: сколько секунд не трогать файлы без постов и недавно
+# читанные миниатюры и сколько байт может занимать каталог миниатюр
+MEDIA_GC_GRACE = 60 * 60 * 24
+# Сколько секунд после загрузки файл ждет сохранения своего поста:
+# столько его не удаляет и снятие последней ссылки
+MEDIA_UPLOAD_GRACE = 60 * 10
+THUMBNAIL_CACHE_BUDGET = 2 * 2 ** 30
+# Ширины вариантов картинки поста для srcset
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+# Сколько секунд файл считается стоящим в очереди на миниатюры
+THUMBNAIL_QUEUE_TIMEOUT = 5 * 60
+# Ключи миниатюр страницы читаются одним get_many
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_PREFETCH = True
+
+# Очередь задач в базе (приложение jobs, воркер run_jobs)
+JOBS_BATCH_SIZE = 20
+JOBS_LEASE_TIMEOUT = 60
+JOBS_POLL_INTERVAL = 1
+JOBS_MAX_ATTEMPTS = 5
+# Задержка перед повтором удваивается с каждой попыткой
+JOBS_RETRY_DELAY = 10
+# Посты авторов с большим числом подписчиков раскладываются по лентам
+# задачей очереди, а не в запросе публикации
+FEED_INLINE_FAN_OUT = 100
+
+# Наибольший размер страницы JSON API (?limit=)
+API_MAX_LIMIT = 100
+
+# Сколько подсказок отдает автодополнение групп и пользователей
+AUTOCOMPLETE_LIMIT = 10
+# Журнал изменений индексов автодополнения для других процессов:
+# сколько изменений можно догнать по нему и сколько секунд он хранится
+AUTOCOMPLETE_CHANGELOG_SIZE = 1000
+AUTOCOMPLETE_CHANGELOG_TIMEOUT = 60 * 60
 
 ROOT_URLCONF = 'yatube.urls'
 
@@ -150,8 +224,10 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
 
-# Connect filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят через очередь задач; воркер отправляет их через
+# filebased.EmailBackend
+EMAIL_BACKEND = 'jobs.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 # Specify the directory in which the files of letters will be added
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -161,8 +237,27 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш в файле SQLite общий для всех воркеров, внешний сервис не нужен;
+# неизменяемые под своим ключом значения (карточки, страницы гостей)
+# процесс держит еще и у себя (core.cache.tiered)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 2 ** 20,
+        },
+    },
 }
+
+# Тесты переносят общий кэш во временный файл (core.test_runner)
+TEST_RUNNER = 'core.test_runner.TestRunner'